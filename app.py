@@ -1,195 +1,220 @@
 from email import errors
+import logging
 from flask import Flask
 from flask import render_template
 from flask import request
 from flask import redirect
 from flask import url_for
 from flask import flash
+from flask import jsonify
+from flask import stream_template
+from flask import stream_with_context
+from flask import Response
+import applog
+import assets
+import compression
 import db
 import connect
-from datetime import date, datetime
+import counters
+import datagen
+import enrolment
+import exporter
+import importer
+import migrate
+import pagination
+import querycache
+import refdata
+import search
+import templatecache
+import versions
+from validation import get_dob_limits, validate_student_form
+from datetime import date
 
 
 app = Flask(__name__)
 app.secret_key = 'sds_secret_2025'  # Set a secret key for session/flash
 
+# Default settings; override with SDS_<NAME> environment variables (e.g. SDS_PAGE_SIZE=100)
+app.config.from_mapping(
+    PAGE_SIZE=50,        # rows per page on the student / teacher lists
+    MAX_PAGE_SIZE=200,   # upper bound for ?per_page=
+    REFDATA_TTL=300,     # seconds grades / dance types stay cached
+    CLASS_LIST_STREAM=False,    # stream /classes by default (?stream=1 / ?stream=0 per request)
+    STREAM_CHUNK_SIZE=16384,    # bytes of HTML sent per chunk when streaming
+    BULK_ENROL_MAX=2000,        # most (student, class) pairs per bulk enrolment request
+    IMPORT_BATCH_SIZE=1000,     # rows per multi-row INSERT / transaction in the CSV import
+    CONDITIONAL_GET=True,       # ETag / 304 Not Modified on the list and report pages
+    QUERY_CACHE_TTL=30,         # seconds /classes and the teacher report results are shared (0 = off)
+    QUERY_CACHE_MAX_ENTRIES=256,
+    DB_POOL_MIN_SIZE=1,         # connections opened up front
+    DB_POOL_MAX_SIZE=10,        # most open connections per worker; extra requests wait
+    DB_POOL_TIMEOUT=5,          # seconds a request waits for a free connection
+    DB_POOL_MAX_AGE=3600,       # seconds before a connection is retired
+    DB_POOL_HEALTH_CHECK_INTERVAL=30,   # ping connections idle longer than this (seconds)
+    SQL_SLOW_QUERY_MS=200,      # statements slower than this go to the slow-query log (-1 = off)
+    SQL_SLOW_QUERY_LOG=None,    # slow-query log file (default: stderr with the other logs)
+    SQL_STATS_HEADER=True,      # Server-Timing / X-DB-Query-Count headers on every response
+    DB_REPLICAS=[],             # read replicas, e.g. SDS_DB_REPLICAS='[{"host": "10.0.0.12"}]'
+    DB_REPLICA_MAX_LAG=5,       # seconds behind the primary before a replica is skipped
+    DB_REPLICA_LAG_CHECK_INTERVAL=2,
+    DB_REPLICA_CONNECT_TIMEOUT=2,       # seconds before an unreachable replica is given up on
+    READ_YOUR_WRITES_SECONDS=5, # after a write, that browser reads from the primary this long
+    TEMPLATE_BYTECODE_CACHE=True,       # compiled templates on disk, shared by workers
+    TEMPLATE_BYTECODE_CACHE_DIR=None,   # default: a per-user temp directory
+    TEMPLATE_FRAGMENT_CACHE=True,       # {% cache %} blocks (nav, footer, grade dropdowns)
+    TEMPLATE_FRAGMENT_MAX_ENTRIES=512,
+    COMPRESS=True,              # gzip / Brotli responses for browsers that accept them
+    COMPRESS_MIN_SIZE=1024,     # bytes; smaller responses are sent as they are
+    COMPRESS_LEVEL=6,           # gzip level (1-9)
+    COMPRESS_BR_QUALITY=5,      # Brotli quality (0-11); 4-6 suits per-request compression
+    LOG_LEVEL="INFO",           # level of the sds.* loggers
+    LOG_LEVELS={},              # per-logger levels, e.g. SDS_LOG_LEVELS='{"sds.sql": "WARNING"}'
+    LOG_FORMAT="json",          # "json" (one object per line) or "text"
+    LOG_FILE=None,              # default: stderr
+    LOG_DEBUG_SAMPLE_RATE=0.01, # share of requests whose DEBUG records are written
+    LOG_QUEUE_SIZE=10000,       # records buffered for the log thread; more are dropped, not waited for
+)
+app.config.from_prefixed_env("SDS")
+
+# Structured logging on a background thread, with request ids (before anything logs)
+applog.init_app(app)
+log = logging.getLogger("sds.app")
+
 # Initialize database connection
 db.init_db(
-    app, connect.dbuser, connect.dbpass, connect.dbhost, connect.dbname, connect.dbport)
+    app, connect.dbuser, connect.dbpass, connect.dbhost, connect.dbname, connect.dbport,
+    pool_min_size=app.config["DB_POOL_MIN_SIZE"],
+    pool_max_size=app.config["DB_POOL_MAX_SIZE"],
+    pool_timeout=app.config["DB_POOL_TIMEOUT"],
+    pool_max_age=app.config["DB_POOL_MAX_AGE"],
+    pool_health_check_interval=app.config["DB_POOL_HEALTH_CHECK_INTERVAL"],
+    replicas=app.config["DB_REPLICAS"],
+    replica_max_lag=app.config["DB_REPLICA_MAX_LAG"],
+    replica_lag_check_interval=app.config["DB_REPLICA_LAG_CHECK_INTERVAL"],
+    replica_connect_timeout=app.config["DB_REPLICA_CONNECT_TIMEOUT"],
+    read_your_writes=app.config["READ_YOUR_WRITES_SECONDS"])
+
+# Per-request query counts / DB time, repeated statements and the slow-query log
+db.init_instrumentation(app)
+
+# Register `flask rebuild-search-index`, `flask rebuild-enrolment-counters`,
+# `flask import-students`, `flask export`, `flask bump-table-versions`,
+# `flask schema ...` (migrations), `flask generate-data`, `flask compile-templates`,
+# `flask build-assets` and `flask precompress-static`
+search.init_app(app)
+counters.init_app(app)
+importer.init_app(app)
+exporter.init_app(app)
+versions.init_app(app)
+migrate.init_app(app)
+datagen.init_app(app)
+templatecache.init_app(app)
+assets.init_app(app)
+compression.init_app(app)
+
+# Load grades / dance types into the reference-data cache
+refdata.init_app(app)
+
+# Report query cache settings
+querycache.init_app(app)
 
 
 # ==============================
-# Form Validation 
+# Pagination + Display Helpers
 # ==============================
 
-# Helper function to get DOB limits
-from datetime import date
-
-def get_dob_limits():
+def get_page_args(key_size):
     """
-    DOB limits for HTML date picker.
-    - min: today - 20 years
-    - max: today - 1 year  (student must be at least 1 year old)
-    Returns (dob_min, dob_max) as ISO strings.
+    Read keyset pagination arguments from the query string.
+    Returns (after, before, page_size); invalid cursors are ignored.
     """
-    today = date.today()
-
-    # min_dob: today - 20 years
     try:
-        min_dob = date(today.year - 20, today.month, today.day)
+        page_size = int(request.args.get("per_page", app.config["PAGE_SIZE"]))
     except ValueError:
-        min_dob = date(today.year - 20, today.month, 28)
+        page_size = app.config["PAGE_SIZE"]
+    page_size = max(1, min(page_size, app.config["MAX_PAGE_SIZE"]))
 
-    # max_dob: today - 1 year
-    try:
-        max_dob = date(today.year - 1, today.month, today.day)
-    except ValueError:
-        max_dob = date(today.year - 1, today.month, 28)
+    after = pagination.decode_cursor(request.args.get("after"), key_size)
+    before = pagination.decode_cursor(request.args.get("before"), key_size)
+    return after, before, page_size
 
-    return min_dob.isoformat(), max_dob.isoformat()
 
-def validate_student_form(form):
-    """
-    Validation shared by Add + Edit.
-    Returns (clean_data, errors)
-
-    Rules :
-    - first_name / last_name: required; min length 2; letters only (spaces, hyphen, apostrophe allowed); max length 50
-    - email: optional; basic format check (no regex)
-    - phone: must contain at least 6 digits if provided
-    - date_of_birth: REQUIRED; must be valid date; sensible range (today-20 years to today)
-    - enrollment_date: defaults to today; if provided, cannot be future
-    """
-    errors = []
-
-    # Names (required, clearer messages, no regex)
-    first_name = (form.get('first_name') or '').strip()
-    last_name  = (form.get('last_name') or '').strip()
-
-    def validate_name(value: str, label: str):
-        """Basic name rules without regex."""
-        if not value:
-            errors.append(f"{label} is required.")
-            return
-
-        # Minimum length (teacher example: 'B' is not OK)
-        if len(value) < 2:
-            errors.append(f"{label} must be at least 2 characters.")
-            return
-
-        if len(value) > 50:
-            errors.append(f"{label} must be 50 characters or fewer.")
-            return
-
-        if any(ch.isdigit() for ch in value):
-            errors.append(f"{label} cannot contain numbers.")
-            return
-
-        # Allow letters plus space, hyphen, apostrophe
-        allowed_extra = set(" -'")
-        for ch in value:
-            if ch.isalpha() or ch in allowed_extra:
-                continue
-            errors.append(f"{label} can only contain letters, spaces, hyphens, or apostrophes.")
-            return
-
-    validate_name(first_name, "First name")
-    validate_name(last_name, "Last name")
-
-    # Email (optional, no regex, clearer reasons)
-    email = (form.get('email') or '').strip()
-    if email:
-        if email.count("@") != 1:
-            errors.append("Email must contain one '@'.")
-        else:
-            local, domain = email.split("@")
-            if not local:
-                errors.append("Email is missing the part before '@'.")
-            elif not domain:
-                errors.append("Email is missing the domain after '@'.")
-            elif domain.startswith(".") or domain.endswith("."):
-                errors.append("Email domain cannot start or end with a dot '.'.")
-            elif "." not in domain:
-                errors.append("Email domain must contain a dot (e.g., example.com).")
-
-    # Phone (simple digit count rule)
-    phone = (form.get('phone') or '').strip()
-    if phone:
-        digits_only = "".join(ch for ch in phone if ch.isdigit())
-        if len(digits_only) < 6:
-            errors.append("Phone must contain at least 6 digits.")
-
-    # Date of Birth (REQUIRED; sensible range)
-    dob_raw = (form.get('date_of_birth') or '').strip()
-    dob = None
-
-    if not dob_raw:
-        errors.append("Date of birth is required.")
-    else:
-        try:                  # a date picker will be used from the HTML5 spec,
-                              #so we have to use this format (YYYY-MM-DD) for better validation.
-            dob = datetime.strptime(dob_raw, "%Y-%m-%d").date()
-        except ValueError: 
-            errors.append("Please select a valid date of birth.")
+def buffered(chunks, size):
+    """Group small template output pieces into chunks of about `size` characters."""
+    buf = []
+    length = 0
+    for piece in chunks:
+        buf.append(piece)
+        length += len(piece)
+        if length >= size:
+            yield "".join(buf)
+            buf = []
+            length = 0
+    if buf:
+        yield "".join(buf)
 
-        else:
-            today = date.today()
-
-            # Sensible range assumption for assignment
-            # minimum: today minus 20 years; maximum: 1 years  old
-            try:
-                min_dob = date(today.year - 20, today.month, today.day)
-            except ValueError:
-                # Handle leap day edge case (Feb 29)
-                min_dob = date(today.year - 20, today.month, 28)
-            
-            try:
-                max_dob = date(today.year - 1, today.month, today.day)
-            except ValueError:
-                # Handle leap day edge case (Feb 29)
-                max_dob = date(today.year - 1, today.month, 28)
-
-
-            if dob > max_dob:
-                errors.append("Student must be at least 1 year old.")
-            elif dob < min_dob:
-                errors.append("Date of birth must be within the last 20 years.")
-                
-
-    # Enrollment Date (default today, cannot be future)
-    enrollment_date_raw = (form.get('enrollment_date') or '').strip()
-    if enrollment_date_raw:
-        try:
-            ed = datetime.strptime(enrollment_date_raw, "%Y-%m-%d").date()
-        except ValueError:
-            errors.append("Please select a valid enrollment date.")
 
+@app.template_filter("dmy")
+def format_dmy(value):
+    """Format a date as DD/MM/YYYY for display (only rows on the current page are formatted)"""
+    return value.strftime("%d/%m/%Y") if value else ""
 
-            enrollment_date = None
-        else:
-            if ed > date.today():
-               errors.append("Enrollment date cannot be in the future.")
-
-               enrollment_date = None
-            else:
-                enrollment_date = ed.isoformat()
-    else:
-        enrollment_date = date.today().isoformat()
 
-    clean = {
-        "first_name": first_name,
-        "last_name": last_name,
-        "email": email or None,
-        "phone": phone or None,
-        "date_of_birth": dob.isoformat() if dob else None,
-        "enrollment_date": enrollment_date
-    }
-
-    return clean, errors
+# ==============================
+# Student Grade Helpers
+# ==============================
 
+def read_grade_selections(form):
+    """
+    Read the grade_<dancetype_id> dropdowns from a submitted form.
+    Returns {dancetype_id: grade_id} for every dance type with a grade selected.
+    """
+    selections = {}
+    for dtid in refdata.get_dancetype_ids():
+        raw = (form.get(f"grade_{dtid}") or "").strip()
+        if raw.isdigit():
+            selections[dtid] = int(raw)
+    return selections
 
 
+def save_student_grades(cur, sid, selections, is_new=False):
+    """
+    Bring studentgrades for one student in line with `selections`.
 
+    Only the difference is written: rows no longer selected are removed with
+    one DELETE and new (dance type, grade) pairs are added with one multi-row
+    INSERT, so a save costs a constant number of round trips and unchanged
+    rows are left alone. Call inside the same transaction as the student write.
+    """
+    current = set()
+    if not is_new:
+        cur.execute("""
+            SELECT dancetype_id, grade_id
+            FROM studentgrades
+            WHERE student_id=%s;
+        """, (sid,))
+        current = {(r["dancetype_id"], r["grade_id"]) for r in cur.fetchall()}
+
+    wanted = set(selections.items())
+    stale = sorted(current - wanted)
+    missing = sorted(wanted - current)
+
+    if stale:
+        placeholders = ", ".join(["(%s, %s)"] * len(stale))
+        params = [sid]
+        for dtid, gid in stale:
+            params.extend([dtid, gid])
+        cur.execute(f"""
+            DELETE FROM studentgrades
+            WHERE student_id=%s AND (dancetype_id, grade_id) IN ({placeholders});
+        """, params)
+
+    if missing:
+        # executemany sends this as a single multi-row INSERT
+        cur.executemany("""
+            INSERT INTO studentgrades (student_id, dancetype_id, grade_id)
+            VALUES (%s, %s, %s);
+        """, [(sid, dtid, gid) for dtid, gid in missing])
 
 
 # ==============================
@@ -202,25 +227,47 @@ def home():
     return render_template("home.html")
 
 
+# ==============================
+# Database Pool Statistics
+# ==============================
+
+@app.route("/db/pool-stats")
+def db_pool_stats():
+    """Return connection pool usage (in use, idle, waits, wait time) as JSON"""
+    return jsonify(db.pool_stats())
+
+
+@app.route("/db/query-cache-stats")
+def db_query_cache_stats():
+    """Return report query cache and template fragment cache hits / misses as JSON"""
+    return jsonify(dict(querycache.stats(), fragments=templatecache.stats()))
+
+
 # ==============================
 # Teacher List
 # ==============================
 
 @app.route("/teachers", methods=["GET"])
+@db.replica_reads
+@versions.conditional("teachers")
 def teacher_list():
     """Display list of all teachers"""
     cursor = db.get_cursor()
+    after, before, page_size = get_page_args(3)
 
-    # Retrieve basic teacher information
-    querystr = """
+    # Retrieve one page of teachers, ordered by name (keyset pagination)
+    page = pagination.keyset_page(
+        cursor,
+        """
         SELECT teacher_id, first_name, last_name, email, phone
-        FROM teachers;
-    """
-    cursor.execute(querystr)
-    teachers = cursor.fetchall()
+        FROM teachers
+        """,
+        columns=["last_name", "first_name", "teacher_id"],
+        key_fields=["last_name", "first_name", "teacher_id"],
+        after=after, before=before, page_size=page_size)
     cursor.close()
 
-    return render_template("teacher_list.html", teachers=teachers)
+    return render_template("teacher_list.html", teachers=page["rows"], page=page, page_size=page_size)
 
 
 # ==============================
@@ -228,19 +275,24 @@ def teacher_list():
 # ==============================
 
 @app.route("/students")
+@db.replica_reads
+@versions.conditional("students", "studentsearch")
 def student_list():
     """
     Display student list.
-    Supports optional name search using query parameter `q`.
+    Supports optional name / email search using query parameter `q`
+    (prefix match on each word, best matches first).
     """
     cursor = db.get_cursor()
 
     # Get search term (trim whitespace)
     q = request.args.get("q", "").strip()
+    # Search results page on (score, last name, first name, id); the plain list on the last three
+    after, before, page_size = get_page_args(4 if q else 3)
 
     # Base query for student listing
     base_query = """
-        SELECT DISTINCT
+        SELECT
             s.student_id,
             s.first_name,
             s.last_name,
@@ -252,36 +304,28 @@ def student_list():
     """
 
     # User clicked search with empty input
-    if "q" in request.args and q == "":
+    if "q" in request.args and q == "" and not (after or before):
         flash("No search term entered. Showing all students.", "info")
 
-    # Apply search filter if provided
     if q != "":
-        query = base_query + """
-            WHERE s.first_name LIKE %s OR s.last_name LIKE %s
-            ORDER BY s.last_name, s.first_name;
-        """
-        cursor.execute(query, (f"%{q}%", f"%{q}%"))
+        # Ranked prefix search over the studentsearch token index
+        page = search.search_page(cursor, q, after=after, before=before, page_size=page_size)
     else:
-        # Default: show all students alphabetically
-        query = base_query + """
-            ORDER BY s.last_name, s.first_name;
-        """
-        cursor.execute(query)
-
-    students = cursor.fetchall()
-    for stu in students:
-        if stu.get("date_of_birth"):
-           stu["date_of_birth"] = stu["date_of_birth"].strftime("%d/%m/%Y")
-        if stu.get("enrollment_date"):
-           stu["enrollment_date"] = stu["enrollment_date"].strftime("%d/%m/%Y")
+        # One page of students alphabetically (keyset on last name, first name, id
+        # so the idx_students_name index serves the sort and the page boundary)
+        page = pagination.keyset_page(
+            cursor, base_query,
+            columns=["s.last_name", "s.first_name", "s.student_id"],
+            key_fields=["last_name", "first_name", "student_id"],
+            after=after, before=before, page_size=page_size)
+    students = page["rows"]
 
     # Search performed but no results found
-    if q and len(students) == 0:
+    if q and len(students) == 0 and not (after or before):
         flash("No students matched your search.", "warning")
 
     cursor.close()
-    return render_template("student_list.html", students=students)
+    return render_template("student_list.html", students=students, page=page, q=q, page_size=page_size)
 
 
 
@@ -290,15 +334,27 @@ def student_list():
 # Class List
 # ==============================
 
+# Tables the class list is built from
+CLASS_LIST_TABLES = ("classes", "studentclasses", "students", "dancetype", "grades")
+
 @app.route("/classes")
+@db.replica_reads
+@versions.conditional(*CLASS_LIST_TABLES)
 def class_list():
     """
     Display all classes and enrolled students.
     Classes are ordered by dance type and grade level.
+
+    Classes and enrolments are read as two narrow result sets (class details
+    once per class, only student columns per enrolment) and merged into
+    one nested roster per class.
     """
-    cursor = db.get_cursor()
-    # Retrieve class and student information
-    query = """
+    # Streaming mode: enrolment rows flow from a server-side cursor straight into
+    # the template output, so memory stays flat however many students are enrolled
+    stream = request.args.get("stream", "1" if app.config["CLASS_LIST_STREAM"] else "0") == "1"
+
+    # Class details (one row per class)
+    class_query = """
         SELECT
             c.class_id,
             c.class_name,
@@ -306,29 +362,90 @@ def class_list():
             c.schedule_time,
             dt.dancetype_name,
             g.grade_level,
-            g.grade_name,
+            g.grade_name
+        FROM classes c
+        JOIN dancetype dt ON c.dancetype_id = dt.dancetype_id
+        LEFT JOIN grades g ON c.grade_id = g.grade_id
+        ORDER BY
+            dt.dancetype_name,
+            (g.grade_level IS NULL),
+            g.grade_level,
+            c.class_name,
+            c.class_id;
+    """
+
+    # Enrolled students, in the same class order as above
+    enrol_query = """
+        SELECT
+            sc.class_id,
             s.student_id,
             s.first_name,
             s.last_name
-        FROM classes c
+        FROM studentclasses sc
+        JOIN students s ON sc.student_id = s.student_id
+        JOIN classes c ON sc.class_id = c.class_id
         JOIN dancetype dt ON c.dancetype_id = dt.dancetype_id
         LEFT JOIN grades g ON c.grade_id = g.grade_id
-        LEFT JOIN studentclasses sc ON c.class_id = sc.class_id
-        LEFT JOIN students s ON sc.student_id = s.student_id
         ORDER BY
             dt.dancetype_name,
             (g.grade_level IS NULL),
             g.grade_level,
             c.class_name,
+            c.class_id,
             s.last_name,
             s.first_name;
     """
 
-    cursor.execute(query)
-    classes = cursor.fetchall()
-    cursor.close()
+    def read_rosters(unbuffered):
+        cursor = db.get_cursor()
+
+        # Read both result sets from one snapshot so their class order matches
+        # (the transaction ends when the connection goes back to the pool)
+        cursor.execute("START TRANSACTION READ ONLY;")
+        cursor.execute(class_query)
+        classes = cursor.fetchall()
+        cursor.close()
+
+        enrol_cursor = db.get_cursor(unbuffered=unbuffered)
+        enrol_cursor.execute(enrol_query)
+        return classes, enrol_cursor
+
+    if stream:
+        classes, enrol_cursor = read_rosters(unbuffered=True)
+        rosters = iter_rosters(classes, db.iter_rows(enrol_cursor))
+        chunks = stream_template("class_list.html", classes=rosters)
+        return Response(
+            stream_with_context(buffered(chunks, app.config["STREAM_CHUNK_SIZE"])),
+            mimetype="text/html")
+
+    def load_rosters():
+        classes, enrol_cursor = read_rosters(unbuffered=False)
+        rosters = tuple(iter_rosters(classes, enrol_cursor.fetchall()))
+        enrol_cursor.close()
+        return rosters
+
+    # Shared between requests until the TTL runs out or a class / enrolment changes;
+    # concurrent misses wait for one query instead of all running it
+    rosters = querycache.cached((class_query, enrol_query), CLASS_LIST_TABLES, load_rosters)
 
-    return render_template("class_list.html", classes=classes)
+    return render_template("class_list.html", classes=rosters)
+
+
+def iter_rosters(classes, enrolments):
+    """
+    Merge class rows with enrolment rows sorted in the same class order.
+    Yields each class as a dict with a `students` list; only one class's
+    students are held at a time, so this works on a streamed cursor too.
+    """
+    enrolments = iter(enrolments)
+    pending = next(enrolments, None)
+
+    for cls in classes:
+        students = []
+        while pending is not None and pending["class_id"] == cls["class_id"]:
+            students.append(pending)
+            pending = next(enrolments, None)
+        yield dict(cls, students=students)
 
 
 
@@ -339,6 +456,7 @@ def class_list():
 
 
 @app.route('/student/edit', methods=['GET', 'POST'])
+@db.transactional
 def edit_student():
     
     today = date.today().isoformat()
@@ -357,31 +475,12 @@ def edit_student():
             for e in errors:
                 flash(e, "danger")
 
-            cur = db.get_cursor()
-
-            # Dropdown data
-            cur.execute("""
-                SELECT grade_id, grade_name, grade_level
-                FROM grades
-                ORDER BY grade_level, grade_name;
-            """)
-            grades = cur.fetchall()
-
-            cur.execute("""
-                SELECT dancetype_id, dancetype_name
-                FROM dancetype
-                ORDER BY dancetype_name;
-            """)
-            dancetypes = cur.fetchall()
+            # Dropdown data (cached reference data)
+            grades = refdata.get_grades()
+            dancetypes = refdata.get_dancetypes()
 
             # Rebuild student_grades from submitted form (preserve selections)
-            student_grades = {}
-            for dt in dancetypes:
-                raw = (request.form.get(f"grade_{dt['dancetype_id']}") or "").strip()
-                if raw.isdigit():
-                    student_grades[dt['dancetype_id']] = int(raw)
-
-            cur.close()
+            student_grades = read_grade_selections(request.form)
 
             # Preserve user-entered values in the form
             # enrollment_date is read-only in Edit, but we keep it for display.
@@ -412,25 +511,14 @@ def edit_student():
             clean["phone"], clean["date_of_birth"], sid
         ))
 
-        # Replace grades (simple approach: delete then insert)
-        cur.execute("DELETE FROM studentgrades WHERE student_id=%s;", (sid,))
-
-        cur.execute("SELECT dancetype_id FROM dancetype;")
-        dt_ids = [r["dancetype_id"] for r in cur.fetchall()]
+        # Keep the search index in step with the new name / email
+        search.index_student(cur, sid, clean["first_name"], clean["last_name"], clean["email"])
 
-        for dtid in dt_ids:
-            raw = (request.form.get(f"grade_{dtid}") or "").strip()
-            if raw == "":
-                continue
-            try:
-                gid = int(raw)
-            except ValueError:
-                continue
+        # Apply only the grade changes (batched)
+        save_student_grades(cur, sid, read_grade_selections(request.form))
 
-            cur.execute("""
-                INSERT INTO studentgrades (student_id, dancetype_id, grade_id)
-                VALUES (%s, %s, %s);
-            """, (sid, dtid, gid))
+        # Pages showing students are now out of date
+        versions.bump(cur, "students", "studentgrades", "studentsearch")
 
         cur.close()
         flash("Student updated successfully.", "success")
@@ -441,40 +529,20 @@ def edit_student():
     if not sid:
         return redirect(url_for('student_list'))
 
-    cur = db.get_cursor()
-
-    # Load student details
-    cur.execute("""
-        SELECT student_id, first_name, last_name, email, phone, date_of_birth, enrollment_date
-        FROM students
-        WHERE student_id=%s;
-    """, (sid,))
-    student = cur.fetchone()
-
-    # Dropdown options
-    cur.execute("""
-        SELECT grade_id, grade_name, grade_level
-        FROM grades
-        ORDER BY grade_level, grade_name;
-    """)
-    grades = cur.fetchall()
-
-    cur.execute("""
-        SELECT dancetype_id, dancetype_name
-        FROM dancetype
-        ORDER BY dancetype_name;
-    """)
-    dancetypes = cur.fetchall()
-
-    # Current grade selections for this student
-    cur.execute("""
-        SELECT dancetype_id, grade_id
-        FROM studentgrades
-        WHERE student_id=%s;
-    """, (sid,))
-    student_grades = {r["dancetype_id"]: r["grade_id"] for r in cur.fetchall()}
-
-    cur.close()
+    # Student details and current grade selections (independent, run in parallel)
+    student, grade_rows = db.gather(
+        ("""
+            SELECT student_id, first_name, last_name, email, phone, date_of_birth, enrollment_date
+            FROM students
+            WHERE student_id=%s;
+        """, (sid,), "one"),
+        ("""
+            SELECT dancetype_id, grade_id
+            FROM studentgrades
+            WHERE student_id=%s;
+        """, (sid,)),
+    )
+    student_grades = {r["dancetype_id"]: r["grade_id"] for r in grade_rows}
 
     return render_template(
         'student_edit.html',
@@ -483,8 +551,8 @@ def edit_student():
         today=today,
         dob_min=dob_min,
         dob_max=dob_max,
-        grades=grades,
-        dancetypes=dancetypes,
+        grades=refdata.get_grades(),
+        dancetypes=refdata.get_dancetypes(),
         student_grades=student_grades)
 
 
@@ -496,6 +564,7 @@ def edit_student():
 # ==============================
 
 @app.route('/student/add', methods=['GET', 'POST'])
+@db.transactional
 def add_student():
    
     today = date.today().isoformat()
@@ -511,30 +580,12 @@ def add_student():
             for e in errors:
                 flash(e, "danger")
 
-            cur = db.get_cursor()
-
-            cur.execute("""
-                SELECT grade_id, grade_name, grade_level
-                FROM grades
-                ORDER BY grade_level, grade_name;
-            """)
-            grades = cur.fetchall()
-
-            cur.execute("""
-                SELECT dancetype_id, dancetype_name
-                FROM dancetype
-                ORDER BY dancetype_name;
-            """)
-            dancetypes = cur.fetchall()
+            # Dropdown data (cached reference data)
+            grades = refdata.get_grades()
+            dancetypes = refdata.get_dancetypes()
 
             # Preserve grade selections from submitted form
-            student_grades = {}
-            for dt in dancetypes:
-                raw = (request.form.get(f"grade_{dt['dancetype_id']}") or "").strip()
-                if raw.isdigit():
-                    student_grades[dt['dancetype_id']] = int(raw)
-
-            cur.close()
+            student_grades = read_grade_selections(request.form)
 
             # Preserve user-entered values
             student = {}
@@ -564,47 +615,21 @@ def add_student():
         ))
         new_sid = cur.lastrowid
 
-        # Insert any selected grades
-        cur.execute("SELECT dancetype_id FROM dancetype;")
-        dt_ids = [r["dancetype_id"] for r in cur.fetchall()]
+        # Make the new student searchable
+        search.index_student(cur, new_sid, clean["first_name"], clean["last_name"], clean["email"])
 
-        for dtid in dt_ids:
-            raw = (request.form.get(f"grade_{dtid}") or "").strip()
-            if raw == "":
-                continue
-            try:
-                gid = int(raw)
-            except ValueError:
-                continue
+        # Insert any selected grades (one multi-row INSERT)
+        save_student_grades(cur, new_sid, read_grade_selections(request.form), is_new=True)
 
-            cur.execute("""
-                INSERT INTO studentgrades (student_id, dancetype_id, grade_id)
-                VALUES (%s, %s, %s);
-            """, (new_sid, dtid, gid))
+        # Pages showing students are now out of date
+        versions.bump(cur, "students", "studentgrades", "studentsearch")
 
         cur.close()
         flash("Student added successfully.", "success")
         return redirect(url_for('student_list'))
 
     # ---------- GET: show form ----------
-    cur = db.get_cursor()
-
-    cur.execute("""
-        SELECT grade_id, grade_name, grade_level
-        FROM grades
-        ORDER BY grade_level, grade_name;
-    """)
-    grades = cur.fetchall()
-
-    cur.execute("""
-        SELECT dancetype_id, dancetype_name
-        FROM dancetype
-        ORDER BY dancetype_name;
-    """)
-    dancetypes = cur.fetchall()
-
-    cur.close()
-
+    # Dropdowns come from the reference-data cache (no database round trip)
     return render_template(
         'student_edit.html',
         edit=False,
@@ -612,8 +637,8 @@ def add_student():
         today=today,
         dob_min=dob_min,
         dob_max=dob_max,
-        grades=grades,
-        dancetypes=dancetypes,
+        grades=refdata.get_grades(),
+        dancetypes=refdata.get_dancetypes(),
         student_grades={})
 
 
@@ -622,11 +647,47 @@ def add_student():
 
 
 
+# ==============================
+# Import Students (CSV)
+# ==============================
+
+@app.route('/students/import', methods=['GET', 'POST'])
+def import_students():
+    """
+    Upload a CSV of students. Rows are validated like the Add Student form;
+    valid rows are inserted in batches and invalid rows are listed with reasons.
+    """
+    report = None
+
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            flash("Please choose a CSV file to import.", "warning")
+        else:
+            report = importer.import_students(
+                importer.text_stream(upload.stream), batch_size=app.config["IMPORT_BATCH_SIZE"])
+
+            if report["imported"]:
+                flash(f"{report['imported']} students imported.", "success")
+            if report["error_count"]:
+                flash(f"{report['error_count']} rows could not be imported.", "danger")
+            if report["stopped"]:
+                flash(importer.stopped_message(report), "danger")
+
+    return render_template(
+        'student_import.html',
+        report=report,
+        dancetypes=refdata.get_dancetypes())
+
+
+
+
 # ==============================
 # Student Class Summary
 # ==============================
 
 @app.route('/student/class-summary')
+@db.replica_reads
 def student_class_summary():
 
     # Step 1: Get student ID from query string
@@ -634,80 +695,77 @@ def student_class_summary():
     if not sid:
         return redirect(url_for('student_list'))
 
-    cur = db.get_cursor()
+    # The three queries below are independent, so they run in parallel on
+    # pooled connections (db.gather) and the page waits for the slowest only
+    student, current_grades, classes = db.gather(
 
-    # --------------------------------------------------
-    # Step 2: Retrieve basic student information
-    # Used for page heading and validation
-    # --------------------------------------------------
-    cur.execute("""
-        SELECT
-            student_id,
-            first_name,
-            last_name,
-            email,
-            phone,
-            date_of_birth
-        FROM students
-        WHERE student_id = %s;
-    """, (sid,))
-    student = cur.fetchone()
+        # --------------------------------------------------
+        # Step 2: Retrieve basic student information
+        # Used for page heading and validation
+        # --------------------------------------------------
+        ("""
+            SELECT
+                student_id,
+                first_name,
+                last_name,
+                email,
+                phone,
+                date_of_birth
+            FROM students
+            WHERE student_id = %s;
+        """, (sid,), "one"),
+
+        # --------------------------------------------------
+        # Step 3: Retrieve student's current grades (studentgrades)
+        # This shows the student's current grade per dance type
+        # --------------------------------------------------
+        ("""
+            SELECT
+                dt.dancetype_name,
+                g.grade_level,
+                g.grade_name
+            FROM studentgrades sg
+            JOIN dancetype dt ON sg.dancetype_id = dt.dancetype_id
+            JOIN grades g ON sg.grade_id = g.grade_id
+            WHERE sg.student_id = %s
+            ORDER BY
+                dt.dancetype_name,
+                g.grade_level;
+        """, (sid,)),
+
+        # --------------------------------------------------
+        # Step 4: Retrieve classes the student is enrolled in
+        # Ordering:
+        # - Dance type
+        # - Grade level (NULL last)
+        # - Class name
+        # --------------------------------------------------
+        ("""
+            SELECT
+                c.class_id,
+                c.class_name,
+                c.schedule_day,
+                c.schedule_time,
+                dt.dancetype_name,
+                g.grade_level,
+                g.grade_name
+            FROM studentclasses sc
+            JOIN classes c ON c.class_id = sc.class_id
+            JOIN dancetype dt ON c.dancetype_id = dt.dancetype_id
+            LEFT JOIN grades g ON c.grade_id = g.grade_id
+            WHERE sc.student_id = %s
+            ORDER BY
+                dt.dancetype_name,
+                (g.grade_level IS NULL),
+                g.grade_level,
+                c.class_name;
+        """, (sid,)),
+    )
 
     # If student does not exist, return to list
     if not student:
-        cur.close()
         return redirect(url_for('student_list'))
 
-    # --------------------------------------------------
-    # Step 3: Retrieve student's current grades (studentgrades)
-    # This shows the student's current grade per dance type
-    # --------------------------------------------------
-    cur.execute("""
-        SELECT
-            dt.dancetype_name,
-            g.grade_level,
-            g.grade_name
-        FROM studentgrades sg
-        JOIN dancetype dt ON sg.dancetype_id = dt.dancetype_id
-        JOIN grades g ON sg.grade_id = g.grade_id
-        WHERE sg.student_id = %s
-        ORDER BY
-            dt.dancetype_name,
-            g.grade_level;
-    """, (sid,))
-    current_grades = cur.fetchall()
-
-    # --------------------------------------------------
-    # Step 4: Retrieve classes the student is enrolled in
-    # Ordering:
-    # - Dance type
-    # - Grade level (NULL last)
-    # - Class name
-    # --------------------------------------------------
-    cur.execute("""
-        SELECT
-            c.class_id,
-            c.class_name,
-            c.schedule_day,
-            c.schedule_time,
-            dt.dancetype_name,
-            g.grade_level,
-            g.grade_name
-        FROM studentclasses sc
-        JOIN classes c ON c.class_id = sc.class_id
-        JOIN dancetype dt ON c.dancetype_id = dt.dancetype_id
-        LEFT JOIN grades g ON c.grade_id = g.grade_id
-        WHERE sc.student_id = %s
-        ORDER BY
-            dt.dancetype_name,
-            (g.grade_level IS NULL),
-            g.grade_level,
-            c.class_name;
-    """, (sid,))
-    classes = cur.fetchall()
-
-    cur.close()
-
     # Step 5: Handle case where student has no classes
     if not classes:
         flash("This student is not enrolled in any classes.", "warning")
@@ -730,6 +788,7 @@ def student_class_summary():
 import MySQLdb
 
 @app.route('/student/enrol', methods=['GET', 'POST'])
+@db.transactional
 def student_enrol():
    
     # ----- POST: Save enrolment -----
@@ -745,29 +804,31 @@ def student_enrol():
         cur = db.get_cursor()
 
         # Insert enrolment
-        # UNIQUE constraint on (student_id, class_id) prevents duplicates
+        # UNIQUE constraint on (student_id, class_id) prevents duplicates.
+        # The savepoint undoes just this insert if it fails; the request's
+        # transaction (db.transactional) commits once at the end.
         try:
-            cur.execute("""
-                INSERT INTO studentclasses (student_id, class_id)
-                VALUES (%s, %s);
-            """, (sid, class_id))
+            with db.savepoint():
+                cur.execute("""
+                    INSERT INTO studentclasses (student_id, class_id)
+                    VALUES (%s, %s);
+                """, (sid, class_id))
 
-            # IMPORTANT: commit so the insert is saved
-            db.get_db().commit()
+                # Keep the teacher report counters and page versions in step
+                counters.record_enrolments(cur, [(sid, class_id)])
+                versions.bump(cur, "studentclasses")
 
             # Success message
             flash('Enrolment saved successfully.', 'success')
 
         except MySQLdb.IntegrityError:
             # Duplicate enrolment (violates UNIQUE(student_id, class_id))
-            db.get_db().rollback()
             flash('This student is already enrolled in that class.', 'warning')
 
         except Exception as e:
             # Other DB error
-            db.get_db().rollback()
             flash(f'Enrolment failed: {e}', 'danger')
-            print("ENROL ERROR:", e, flush=True)
+            log.exception("enrolment failed", extra={"student_id": sid, "class_id": class_id})
 
         cur.close()
         return redirect(url_for('student_class_summary', student_id=sid))
@@ -837,8 +898,10 @@ def student_enrol():
     """, (sid, sid))
     eligible_classes = cur.fetchall()
 
-    # Debug (optional)
-    print("DEBUG eligible_classes:", eligible_classes, flush=True)
+    # Debug (sampled; see LOG_DEBUG_SAMPLE_RATE)
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("eligible classes", extra={
+            "student_id": sid, "class_ids": [c["class_id"] for c in eligible_classes]})
 
     cur.close()
 
@@ -853,11 +916,115 @@ def student_enrol():
 
 
 
+# ==============================
+# Bulk Enrolment
+# ==============================
+
+def _enrol_id(value, from_form):
+    # JSON ids must be integers (not true, 2.7 or "3"); form fields are digit strings
+    if from_form:
+        if isinstance(value, str) and value.isascii() and value.isdigit():
+            return int(value)
+    elif isinstance(value, int) and not isinstance(value, bool):
+        return value
+    raise ValueError(f"not an id: {value!r}")
+
+
+@app.route('/student/enrol/bulk', methods=['POST'])
+@db.transactional
+def bulk_enrol():
+    """
+    Enrol many students into one class, or one student into many classes.
+
+    Accepts JSON or form data (repeat student_ids / class_ids fields in forms):
+      {"class_id": 3, "student_ids": [1, 2, 5]}
+      {"student_id": 1, "class_ids": [2, 7]}
+    Eligibility and duplicates are checked for all pairs in two queries and
+    the new enrolments are written with one multi-row INSERT IGNORE.
+    Returns per-pair results (enrolled / duplicate / ineligible) as JSON.
+    """
+    data = request.get_json(silent=True)
+    from_form = data is None
+    if from_form:
+        data = {key: request.form.getlist(key) for key in request.form}
+        for key in ("class_id", "student_id"):
+            if key in data:
+                data[key] = data[key][0]
+
+    # A JSON body must be an object, with the id lists as lists
+    if (not isinstance(data, dict)
+            or not isinstance(data.get("student_ids") or [], list)
+            or not isinstance(data.get("class_ids") or [], list)):
+        pairs = []
+    else:
+        try:
+            if data.get("class_id") is not None:
+                class_id = _enrol_id(data["class_id"], from_form)
+                pairs = [(_enrol_id(sid, from_form), class_id) for sid in data.get("student_ids") or []]
+            elif data.get("student_id") is not None:
+                student_id = _enrol_id(data["student_id"], from_form)
+                pairs = [(student_id, _enrol_id(cid, from_form)) for cid in data.get("class_ids") or []]
+            else:
+                pairs = []
+        except ValueError:
+            return jsonify(error="student and class ids must be integers."), 400
+
+    if not pairs:
+        return jsonify(error="Provide class_id with student_ids, or student_id with class_ids."), 400
+    if len(pairs) > app.config["BULK_ENROL_MAX"]:
+        return jsonify(error=f"At most {app.config['BULK_ENROL_MAX']} enrolments per request."), 400
+
+    cur = db.get_cursor()
+    results = enrolment.bulk_enrol(cur, pairs)
+    cur.close()
+
+    summary = {status: 0 for status in (enrolment.ENROLLED, enrolment.DUPLICATE, enrolment.INELIGIBLE)}
+    for status in results.values():
+        summary[status] += 1
+
+    return jsonify(
+        results=[
+            {"student_id": sid, "class_id": cid, "status": status}
+            for (sid, cid), status in results.items()
+        ],
+        summary=summary)
+
+
+
+
+# ==============================
+# Data Export (CSV / NDJSON)
+# ==============================
+
+@app.route('/export/<dataset>.<fmt>')
+@db.replica_reads
+def export_data(dataset, fmt):
+    """
+    Stream students, classes, enrolments or the teacher report as CSV or NDJSON,
+    e.g. /export/students.csv or /export/enrolments.ndjson
+    """
+    if dataset not in exporter.DATASETS or fmt not in exporter.FORMATS:
+        return jsonify(error="Unknown export.",
+                       datasets=sorted(exporter.DATASETS), formats=sorted(exporter.FORMATS)), 404
+
+    return Response(
+        stream_with_context(exporter.iter_export(dataset, fmt)),
+        mimetype=exporter.FORMATS[fmt],
+        headers={"Content-Disposition": f"attachment; filename={dataset}.{fmt}"})
+
+
+
+
 # ==============================
 # Teacher Report
 # ==============================
 
+# Tables the teacher report is built from (its counters follow studentclasses)
+TEACHER_REPORT_TABLES = ("teachers", "classes", "studentclasses")
+
 @app.route('/teachers/report')
+@db.replica_reads
+@versions.conditional(*TEACHER_REPORT_TABLES)
 def teacher_report():
     """
     Display teacher report showing:
@@ -869,46 +1036,12 @@ def teacher_report():
     cur = db.get_cursor()
 
     # --------------------------------------------------
-    # Query 1: Student count per class per teacher
-    # LEFT JOIN ensures teachers appear even without classes
+    # Classes per teacher with their enrolment counters
+    # (maintained on every enrolment by counters.py, so this
+    #  is an indexed read instead of two aggregates over studentclasses;
+    #  the result is shared between requests until an enrolment changes)
     # --------------------------------------------------
-    cur.execute("""
-        SELECT
-            t.teacher_id,
-            t.first_name,
-            t.last_name,
-            c.class_id,
-            c.class_name,
-            COUNT(sc.student_id) AS student_count
-        FROM teachers t
-        LEFT JOIN classes c ON c.teacher_id = t.teacher_id
-        LEFT JOIN studentclasses sc ON sc.class_id = c.class_id
-        GROUP BY
-            t.teacher_id,
-            t.first_name,
-            t.last_name,
-            c.class_id,
-            c.class_name
-        ORDER BY
-            t.last_name,
-            t.first_name,
-            c.class_name;
-    """)
-    rows = cur.fetchall()
-
-    # --------------------------------------------------
-    # Query 2: Total unique students per teacher
-    # --------------------------------------------------
-    cur.execute("""
-        SELECT
-            t.teacher_id,
-            COUNT(DISTINCT sc.student_id) AS total_students
-        FROM teachers t
-        LEFT JOIN classes c ON c.teacher_id = t.teacher_id
-        LEFT JOIN studentclasses sc ON sc.class_id = c.class_id
-        GROUP BY t.teacher_id;
-    """)
-    totals = {r['teacher_id']: r['total_students'] for r in cur.fetchall()}
+    rows = querycache.fetchall(cur, counters.REPORT_QUERY, tables=TEACHER_REPORT_TABLES)
 
     cur.close()
 
@@ -929,7 +1062,7 @@ def teacher_report():
                 'teacher_id': tid,
                 'first_name': r['first_name'],
                 'last_name': r['last_name'],
-                'total_students': totals.get(tid, 0),
+                'total_students': r['total_students'],
                 'classes': []
             }
             report.append(teacher_block)
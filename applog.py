@@ -0,0 +1,163 @@
+"""
+Structured, non-blocking logging for the `sds` loggers.
+
+Request threads only put records on an in-memory queue; a background
+thread (logging.handlers.QueueListener) formats them and does the I/O, so
+a slow terminal or disk never stalls a request. When the queue is full
+new records are dropped and counted instead of blocking.
+
+Every record carries the request's correlation id (the incoming
+X-Request-ID header, or a new random id), which is also sent back in the
+response header. Output is one JSON object per line (LOG_FORMAT="json")
+or plain text. DEBUG records are sampled per request
+(LOG_DEBUG_SAMPLE_RATE), so debug output can stay on in production at a
+fraction of the volume.
+
+    log = logging.getLogger("sds.<area>")
+    log.debug("eligible classes", extra={"student_id": sid, "count": n})
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import uuid
+
+from flask import g, has_app_context, request
+
+# Parent of every app logger (sds.app, sds.sql, ...)
+root_log = logging.getLogger("sds")
+
+# Incoming request ids are reused only if they look like one
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+# LogRecord attributes that are not `extra` fields
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+queue_size = 10000
+debug_sample_rate = 0.01
+
+_listeners = []
+_dropped = 0
+
+
+def request_id():
+    """Correlation id of the current request ("-" outside requests)."""
+    return g.get("request_id", "-") if has_app_context() else "-"
+
+
+class RequestContextFilter(logging.Filter):
+    """Adds request_id to records and keeps DEBUG records only for sampled requests."""
+
+    def filter(self, record):
+        record.request_id = request_id()
+        if record.levelno > logging.DEBUG:
+            return True
+        if has_app_context() and "log_sampled" in g:
+            return g.log_sampled
+        return random.random() < debug_sample_rate
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, request_id, message and any extra fields."""
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        entry.update((k, v) for k, v in vars(record).items() if k not in _STANDARD_ATTRS)
+        return json.dumps(entry, default=str)
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    # Never block or print a traceback when the queue is full; count the loss instead
+    def enqueue(self, record):
+        global _dropped
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _dropped += 1
+
+
+def background(handler):
+    """
+    Wrap `handler` so it runs on its own thread: returns a QueueHandler to
+    attach to loggers in its place. The thread is stopped (and the queue
+    flushed) at exit.
+    """
+    records = queue.Queue(queue_size)
+    listener = logging.handlers.QueueListener(records, handler, respect_handler_level=True)
+    listener.start()
+    _listeners.append(listener)
+
+    queued = _DroppingQueueHandler(records)
+    queued.addFilter(RequestContextFilter())
+    return queued
+
+
+def stats():
+    # Records dropped because a queue was full, and current queue lengths
+    return {"dropped": _dropped, "queued": [listener.queue.qsize() for listener in _listeners]}
+
+
+def _stop_listeners():
+    for listener in _listeners:
+        listener.stop()
+    _listeners.clear()
+
+
+def _start_request():
+    incoming = request.headers.get("X-Request-ID", "")
+    g.request_id = incoming if _REQUEST_ID.match(incoming) else uuid.uuid4().hex
+    g.log_sampled = random.random() < debug_sample_rate
+
+
+def _add_request_id(response):
+    response.headers["X-Request-ID"] = request_id()
+    return response
+
+
+def init_app(app):
+    """
+    Logging from the app config:
+    - LOG_LEVEL: level of the `sds` loggers (e.g. "INFO", "DEBUG")
+    - LOG_LEVELS: per-logger overrides, e.g. {"sds.sql": "WARNING"}
+    - LOG_FORMAT: "json" or "text"
+    - LOG_FILE: write to this file instead of stderr
+    - LOG_DEBUG_SAMPLE_RATE: share of requests whose DEBUG records are kept (0-1)
+    - LOG_QUEUE_SIZE: records buffered before new ones are dropped
+    """
+    global queue_size, debug_sample_rate
+    queue_size = app.config["LOG_QUEUE_SIZE"]
+    debug_sample_rate = app.config["LOG_DEBUG_SAMPLE_RATE"]
+
+    if app.config["LOG_FILE"]:
+        handler = logging.FileHandler(app.config["LOG_FILE"], encoding="utf-8")
+    else:
+        handler = logging.StreamHandler()
+    if app.config["LOG_FORMAT"] == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+
+    # Replace handlers from an earlier init_app (tests / reloads)
+    for old in root_log.handlers[:]:
+        root_log.removeHandler(old)
+    root_log.addHandler(background(handler))
+    root_log.setLevel(app.config["LOG_LEVEL"])
+    root_log.propagate = False
+    for name, level in app.config["LOG_LEVELS"].items():
+        logging.getLogger(name).setLevel(level)
+
+    app.before_request(_start_request)
+    app.after_request(_add_request_id)
+
+
+atexit.register(_stop_listeners)
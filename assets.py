@@ -0,0 +1,191 @@
+"""
+Static asset build: fingerprinted file names, resized / WebP images, long caching.
+
+    flask --app app build-assets
+
+copies every file in static/ to static/dist/ under a name containing a hash
+of its content (images/dance-hero.jpg -> dist/images/dance-hero.<hash>.jpg)
+and, for JPEG / PNG images, writes resized JPEG and WebP variants at
+IMAGE_WIDTHS. The mapping is stored in static/dist/manifest.json.
+
+Templates use asset_url(filename) instead of url_for('static', ...) and
+asset_srcset(filename, "webp") for responsive images. A changed file gets a
+new name, so files under dist/ are served with a one-year "immutable"
+Cache-Control and repeat visits never re-download or revalidate them.
+Without a build (no manifest) the helpers fall back to the original files.
+
+Text files are also written precompressed (.gz / .br, see compression.py).
+Building images needs Pillow (pip install Pillow); serving does not.
+"""
+
+import hashlib
+import io
+import json
+import os
+
+import click
+from flask import request, url_for
+
+import compression
+
+DIST = "dist"   # output folder inside static/
+MANIFEST = "manifest.json"
+
+# Widths of the resized variants (only those smaller than the original)
+IMAGE_WIDTHS = (480, 960, 1440, 1920)
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+
+# Seconds browsers keep fingerprinted files (they never change under one name)
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# {"files": {source: dist path}, "images": {source: {"width", "height", "variants": {format: [[w, path]]}}}}
+_manifest = {"files": {}, "images": {}}
+
+
+def _fingerprinted(path, data):
+    # images/hero.jpg + content -> dist/images/hero.<hash>.jpg
+    stem, ext = os.path.splitext(path)
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    return f"{DIST}/{stem}.{digest}{ext}".replace(os.sep, "/")
+
+
+def _write(static_folder, path, data):
+    full = os.path.join(static_folder, path)
+    os.makedirs(os.path.dirname(full), exist_ok=True)
+    with open(full, "wb") as f:
+        f.write(data)
+
+
+def _encode(image, fmt):
+    buf = io.BytesIO()
+    if fmt == "webp":
+        image.save(buf, "WEBP", quality=WEBP_QUALITY, method=6)
+    else:
+        image.save(buf, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return buf.getvalue()
+
+
+def _image_variants(static_folder, source):
+    """Write resized JPEG / WebP variants of one image; returns its manifest entry."""
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        raise click.ClickException("Building images needs Pillow: pip install Pillow")
+
+    with Image.open(os.path.join(static_folder, source)) as original:
+        image = ImageOps.exif_transpose(original).convert("RGB")
+
+    width, height = image.size
+    widths = [w for w in IMAGE_WIDTHS if w < width] or [width]
+    stem = os.path.splitext(source)[0]
+    variants = {"webp": [], "jpeg": []}
+
+    for w in widths:
+        resized = image.resize((w, round(height * w / width)), Image.LANCZOS) if w != width else image
+        for fmt, ext in (("webp", ".webp"), ("jpeg", ".jpg")):
+            data = _encode(resized, fmt)
+            path = _fingerprinted(f"{stem}-{w}w{ext}", data)
+            _write(static_folder, path, data)
+            variants[fmt].append([w, path])
+
+    return {"width": width, "height": height, "variants": variants}
+
+
+def build(static_folder):
+    """Fingerprint every static file and build image variants. Returns the manifest."""
+    manifest = {"files": {}, "images": {}}
+    dist = os.path.join(static_folder, DIST)
+
+    for root, dirs, files in os.walk(static_folder):
+        if os.path.abspath(root) == os.path.abspath(static_folder):
+            dirs[:] = [d for d in dirs if d != DIST]
+        dirs.sort()
+        for name in sorted(files):
+            source = os.path.relpath(os.path.join(root, name), static_folder).replace(os.sep, "/")
+            with open(os.path.join(root, name), "rb") as f:
+                data = f.read()
+            path = _fingerprinted(source, data)
+            _write(static_folder, path, data)
+            manifest["files"][source] = path
+
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                manifest["images"][source] = _image_variants(static_folder, source)
+
+    # Drop outputs of earlier builds that are no longer referenced
+    keep = set(manifest["files"].values())
+    keep.update(p for image in manifest["images"].values() for v in image["variants"].values() for _w, p in v)
+    for root, _dirs, files in os.walk(dist):
+        for name in files:
+            path = os.path.relpath(os.path.join(root, name), static_folder).replace(os.sep, "/")
+            if path not in keep and name != MANIFEST:
+                os.remove(os.path.join(root, name))
+
+    with open(os.path.join(dist, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(static_folder):
+    """Read static/dist/manifest.json (empty mapping when there has been no build)."""
+    global _manifest
+    try:
+        with open(os.path.join(static_folder, DIST, MANIFEST), encoding="utf-8") as f:
+            _manifest = json.load(f)
+    except FileNotFoundError:
+        _manifest = {"files": {}, "images": {}}
+    return _manifest
+
+
+# ==============================
+# Template helpers
+# ==============================
+
+def asset_url(filename):
+    """URL of the fingerprinted copy of a static file (the original without a build)."""
+    return url_for("static", filename=_manifest["files"].get(filename, filename))
+
+
+def asset_srcset(filename, fmt="jpeg"):
+    """srcset value ("<url> 480w, ...") for an image's variants in `fmt` ("jpeg" or "webp")."""
+    image = _manifest["images"].get(filename)
+    if not image:
+        return ""
+    return ", ".join(f"{url_for('static', filename=path)} {w}w" for w, path in image["variants"][fmt])
+
+
+def asset_size(filename):
+    """(width, height) of an image from the build, or (None, None)."""
+    image = _manifest["images"].get(filename)
+    return (image["width"], image["height"]) if image else (None, None)
+
+
+def _immutable_headers(response):
+    # Fingerprinted files never change, so let browsers keep them without revalidating
+    if (request.endpoint == "static" and response.status_code in (200, 304)
+            and (request.view_args or {}).get("filename", "").startswith(DIST + "/")):
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+        response.cache_control.no_cache = None
+    return response
+
+
+def init_app(app):
+    """Load the asset manifest, add the template helpers and register `flask build-assets`."""
+    load_manifest(app.static_folder)
+    app.jinja_env.globals.update(asset_url=asset_url, asset_srcset=asset_srcset, asset_size=asset_size)
+    app.after_request(_immutable_headers)
+
+    @app.cli.command("build-assets")
+    def build_assets_command():
+        """Fingerprint static files and build resized / WebP image variants."""
+        manifest = build(app.static_folder)
+        load_manifest(app.static_folder)
+        compression.precompress(app.static_folder)
+        for source, path in manifest["files"].items():
+            click.echo(f"{source} -> {path}")
+        for source, image in manifest["images"].items():
+            widths = ", ".join(str(w) for w, _p in image["variants"]["webp"])
+            click.echo(f"{source}: {widths} px wide (JPEG + WebP)")
@@ -0,0 +1,138 @@
+"""
+Benchmark: /classes roster as one wide join vs two narrow result sets.
+
+Loads the SDS schema into a scratch database, enrols N students into each
+class, then compares the old query (class columns repeated on every
+enrolment row) with the classes + enrolments queries used by class_list:
+server bytes sent, rows returned and time (fetch + merge into rosters).
+
+    python benchmarks/bench_class_roster.py --class-size 5000
+"""
+
+import argparse
+import statistics
+import time
+
+import MySQLdb.cursors
+
+from common import connect_scratch, load_schema
+
+import app as sds_app  # noqa: E402  (needs connect.py, like the app itself)
+
+WIDE_QUERY = """
+    SELECT c.class_id, c.class_name, c.schedule_day, c.schedule_time,
+           dt.dancetype_name, g.grade_level, g.grade_name,
+           s.student_id, s.first_name, s.last_name
+    FROM classes c
+    JOIN dancetype dt ON c.dancetype_id = dt.dancetype_id
+    LEFT JOIN grades g ON c.grade_id = g.grade_id
+    LEFT JOIN studentclasses sc ON c.class_id = sc.class_id
+    LEFT JOIN students s ON sc.student_id = s.student_id
+    ORDER BY dt.dancetype_name, (g.grade_level IS NULL), g.grade_level, c.class_name,
+             s.last_name, s.first_name;
+"""
+
+CLASSES_QUERY = """
+    SELECT c.class_id, c.class_name, c.schedule_day, c.schedule_time,
+           dt.dancetype_name, g.grade_level, g.grade_name
+    FROM classes c
+    JOIN dancetype dt ON c.dancetype_id = dt.dancetype_id
+    LEFT JOIN grades g ON c.grade_id = g.grade_id
+    ORDER BY dt.dancetype_name, (g.grade_level IS NULL), g.grade_level, c.class_name, c.class_id;
+"""
+
+ENROLMENTS_QUERY = """
+    SELECT sc.class_id, s.student_id, s.first_name, s.last_name
+    FROM studentclasses sc
+    JOIN students s ON sc.student_id = s.student_id
+    JOIN classes c ON sc.class_id = c.class_id
+    JOIN dancetype dt ON c.dancetype_id = dt.dancetype_id
+    LEFT JOIN grades g ON c.grade_id = g.grade_id
+    ORDER BY dt.dancetype_name, (g.grade_level IS NULL), g.grade_level, c.class_name, c.class_id,
+             s.last_name, s.first_name;
+"""
+
+
+def seed(conn, class_size):
+    cur = conn.cursor()
+    cur.execute("SELECT class_id FROM classes;")
+    class_ids = [r[0] for r in cur.fetchall()]
+
+    rows = [(f"First{i}", f"Last{i % 997}", f"s{i}@email.com", "021 000 0000", "2012-01-01", "2024-01-01")
+            for i in range(class_size)]
+    for start in range(0, len(rows), 5000):
+        cur.executemany("""
+            INSERT INTO students (first_name, last_name, email, phone, date_of_birth, enrollment_date)
+            VALUES (%s, %s, %s, %s, %s, %s);
+        """, rows[start:start + 5000])
+    cur.execute("SELECT student_id FROM students ORDER BY student_id DESC LIMIT %s;", (class_size,))
+    student_ids = [r[0] for r in cur.fetchall()]
+
+    for class_id in class_ids:
+        pairs = [(sid, class_id) for sid in student_ids]
+        for start in range(0, len(pairs), 5000):
+            cur.executemany("INSERT IGNORE INTO studentclasses (student_id, class_id) VALUES (%s, %s);",
+                            pairs[start:start + 5000])
+    conn.commit()
+    cur.close()
+    return len(class_ids)
+
+
+def bytes_sent(cur):
+    cur.execute("SHOW SESSION STATUS LIKE 'Bytes_sent';")
+    return int(cur.fetchone()["Value"])
+
+
+def measure(conn, fn, repeats):
+    cur = conn.cursor(MySQLdb.cursors.DictCursor)
+    timings, sent, rows = [], 0, 0
+    for _ in range(repeats):
+        before = bytes_sent(cur)
+        start = time.perf_counter()
+        rows = fn(cur)
+        timings.append((time.perf_counter() - start) * 1000)
+        sent = bytes_sent(cur) - before
+    cur.close()
+    return statistics.median(timings), sent, rows
+
+
+def run_wide(cur):
+    cur.execute(WIDE_QUERY)
+    return len(cur.fetchall())
+
+
+def run_nested(cur):
+    cur.execute(CLASSES_QUERY)
+    classes = cur.fetchall()
+    cur.execute(ENROLMENTS_QUERY)
+    enrolments = cur.fetchall()
+    # Assemble the nested rosters as class_list does
+    for _roster in sds_app.iter_rosters(classes, enrolments):
+        pass
+    return len(classes) + len(enrolments)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--class-size", type=int, default=5000, help="students enrolled in every class")
+    parser.add_argument("--database", default="sds_bench_roster")
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+
+    conn = connect_scratch(args.database, recreate=True)
+    load_schema(conn)
+    class_count = seed(conn, args.class_size)
+    print(f"{class_count} classes x {args.class_size} students")
+
+    wide = measure(conn, run_wide, args.repeats)
+    nested = measure(conn, run_nested, args.repeats)
+
+    print(f"\n{'approach':<10}{'median ms':>12}{'bytes sent':>14}{'rows':>10}")
+    print(f"{'wide':<10}{wide[0]:>12.1f}{wide[1]:>14}{wide[2]:>10}")
+    print(f"{'nested':<10}{nested[0]:>12.1f}{nested[1]:>14}{nested[2]:>10}")
+    print(f"\nbytes saved: {1 - nested[1] / wide[1]:.0%}, speed-up: {wide[0] / nested[0]:.2f}x")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
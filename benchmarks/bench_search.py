@@ -0,0 +1,162 @@
+"""
+Benchmark: student search via the token index vs the old LIKE '%q%' query.
+
+Creates a scratch schema (default `sds_bench_search`), loads N synthetic
+students plus their search tokens, then times both queries for a set of
+search terms. Uses the credentials in connect.py.
+
+    python benchmarks/bench_search.py --students 100000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+import MySQLdb
+import MySQLdb.cursors
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import connect  # noqa: E402
+import search   # noqa: E402
+
+FIRST_NAMES = ["Emily", "Oliver", "Sophia", "Jack", "Isabella", "Noah", "Mia", "Lucas",
+               "Amelia", "Liam", "Charlotte", "Leo", "Ava", "Hugo", "Isla", "Mason",
+               "Harper", "Theo", "Ruby", "Arlo", "Mary-Jane", "Zoe", "Finn", "Aria"]
+LAST_NAMES = ["Wilson", "Brown", "Taylor", "Anderson", "Thomas", "Jackson", "White", "Harris",
+              "Martin", "Thompson", "O'Brien", "Walker", "Young", "King", "Wright", "Scott",
+              "Green", "Baker", "Adams", "Nelson", "Carter", "Mitchell", "Roberts", "Ngata"]
+
+SEARCH_TERMS = ["wil", "Wilson", "em", "harris", "o'brien", "mary jane", "zzz", "liam thompson"]
+
+LIKE_QUERY = """
+    SELECT s.student_id, s.first_name, s.last_name, s.email, s.date_of_birth,
+           s.phone, s.enrollment_date
+    FROM students s
+    WHERE s.first_name LIKE %s OR s.last_name LIKE %s
+    ORDER BY s.last_name, s.first_name
+    LIMIT %s;
+"""
+
+
+def setup_schema(conn, students, seed):
+    cur = conn.cursor()
+    cur.execute("DROP TABLE IF EXISTS studentsearch;")
+    cur.execute("DROP TABLE IF EXISTS students;")
+    cur.execute("DROP TABLE IF EXISTS tableversions;")
+    cur.execute("""
+        CREATE TABLE students (
+            student_id INT AUTO_INCREMENT PRIMARY KEY,
+            first_name VARCHAR(100) NOT NULL,
+            last_name VARCHAR(100) NOT NULL,
+            email VARCHAR(255),
+            phone VARCHAR(20),
+            date_of_birth DATE,
+            enrollment_date DATE,
+            KEY idx_students_name (last_name, first_name, student_id)
+        );
+    """)
+    cur.execute("""
+        CREATE TABLE studentsearch (
+            token VARCHAR(100) NOT NULL,
+            student_id INT NOT NULL,
+            field TINYINT NOT NULL,
+            PRIMARY KEY (token, student_id, field),
+            KEY idx_studentsearch_student (student_id)
+        );
+    """)
+    cur.execute("""
+        CREATE TABLE tableversions (
+            table_name VARCHAR(64) PRIMARY KEY,
+            version BIGINT UNSIGNED NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6)
+        );
+    """)
+
+    rng = random.Random(seed)
+    batch = []
+    for i in range(1, students + 1):
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        email = f"{first.lower()}.{last.lower().replace(chr(39), '')}{i}@email.com"
+        batch.append((first, last, email, "021 000 0000", "2012-01-01", "2024-01-01"))
+        if len(batch) == 5000:
+            cur.executemany("""
+                INSERT INTO students (first_name, last_name, email, phone, date_of_birth, enrollment_date)
+                VALUES (%s, %s, %s, %s, %s, %s);
+            """, batch)
+            batch = []
+    if batch:
+        cur.executemany("""
+            INSERT INTO students (first_name, last_name, email, phone, date_of_birth, enrollment_date)
+            VALUES (%s, %s, %s, %s, %s, %s);
+        """, batch)
+    conn.commit()
+    cur.close()
+
+    return search.rebuild_index(conn)
+
+
+def time_query(fn, repeats):
+    timings = []
+    rows = 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        rows = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), max(timings), rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=100000)
+    parser.add_argument("--database", default="sds_bench_search")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=636)
+    parser.add_argument("--reuse", action="store_true", help="skip loading; reuse existing tables")
+    args = parser.parse_args()
+
+    conn = MySQLdb.connect(user=connect.dbuser, password=connect.dbpass, host=connect.dbhost,
+                           port=connect.dbport)
+    conn.cursor().execute(f"CREATE DATABASE IF NOT EXISTS `{args.database}`;")
+    conn.select_db(args.database)
+
+    if not args.reuse:
+        start = time.perf_counter()
+        tokens = setup_schema(conn, args.students, args.seed)
+        print(f"Loaded {args.students} students / {tokens} tokens in {time.perf_counter() - start:.1f}s")
+
+    cur = conn.cursor(MySQLdb.cursors.DictCursor)
+
+    def run_like(term):
+        cur.execute(LIKE_QUERY, (f"%{term}%", f"%{term}%", args.page_size))
+        return len(cur.fetchall())
+
+    def run_index(term):
+        return len(search.search_page(cur, term, page_size=args.page_size)["rows"])
+
+    print(f"\n{'term':<16}{'LIKE median ms':>16}{'LIKE max ms':>14}{'index median ms':>18}{'index max ms':>14}"
+          f"{'speed-up':>10}")
+    for term in SEARCH_TERMS:
+        like_med, like_max, _ = time_query(lambda: run_like(term), args.repeats)
+        idx_med, idx_max, _ = time_query(lambda: run_index(term), args.repeats)
+        speedup = like_med / idx_med if idx_med else float("inf")
+        print(f"{term:<16}{like_med:>16.2f}{like_max:>14.2f}{idx_med:>18.2f}{idx_max:>14.2f}{speedup:>9.1f}x")
+
+    # Show how each query is executed
+    cur.execute("EXPLAIN " + LIKE_QUERY, ("%wil%", "%wil%", args.page_size))
+    print("\nEXPLAIN LIKE:", [(r["table"], r["type"], r["key"], r["rows"]) for r in cur.fetchall()])
+    query, params = search._search_query(["wil"])
+    cur.execute("EXPLAIN " + query + " LIMIT %s", params + [args.page_size])
+    print("EXPLAIN index:", [(r["table"], r["type"], r["key"], r["rows"]) for r in cur.fetchall()])
+
+    cur.close()
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
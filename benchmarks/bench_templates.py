@@ -0,0 +1,110 @@
+"""
+Benchmark: template compile and render times with the template caches.
+
+Cold start: time to load every template in a fresh Jinja environment (as a
+new worker does), compiling from source vs reading the bytecode cache.
+Render: /classes and /students templates with synthetic rows, with the
+fragment cache (nav, footer) off and on. Needs no database.
+
+    python benchmarks/bench_templates.py --classes 200 --students 50
+"""
+
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from jinja2 import FileSystemBytecodeCache
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as sds_app   # noqa: E402
+import templatecache    # noqa: E402
+
+FIRST_NAMES = ["Emily", "Oliver", "Sophia", "Jack", "Isabella", "Noah", "Mia", "Lucas", "Mary-Jane", "Zoe"]
+LAST_NAMES = ["Wilson", "Brown", "Taylor", "Anderson", "O'Brien", "Harris", "Martin", "Te Rangi", "King"]
+
+
+def make_classes(rng, count, per_class):
+    return [{
+        "class_name": f"Ballet Grade {n % 8 + 1} #{n}", "dancetype_name": "Ballet",
+        "grade_name": f"Grade {n % 8 + 1}", "schedule_day": "Monday", "schedule_time": "16:30:00",
+        "students": [{"student_id": n * per_class + i, "first_name": rng.choice(FIRST_NAMES),
+                      "last_name": rng.choice(LAST_NAMES)} for i in range(rng.randint(0, per_class))],
+    } for n in range(count)]
+
+
+def make_students(rng, count):
+    return [{
+        "student_id": n, "first_name": rng.choice(FIRST_NAMES), "last_name": rng.choice(LAST_NAMES),
+        "email": f"student{n}@email.com", "phone": "021 555 0101",
+        "date_of_birth": datetime.date(2014, 3, 9), "enrollment_date": datetime.date(2023, 2, 1),
+    } for n in range(count)]
+
+
+def cold_start(bytecode_dir):
+    # Seconds to load every template in a new environment (like a fresh worker)
+    env = sds_app.app.create_jinja_environment()
+    env.add_extension(templatecache.FragmentCacheExtension)
+    env.filters.update(sds_app.app.jinja_env.filters)
+    env.bytecode_cache = FileSystemBytecodeCache(bytecode_dir) if bytecode_dir else None
+    start = time.perf_counter()
+    for name in env.list_templates(filter_func=lambda n: n.endswith(".html")):
+        env.get_template(name)
+    return time.perf_counter() - start
+
+
+def time_render(template, context, repeat):
+    app = sds_app.app
+    times = []
+    with app.test_request_context("/"):
+        app.jinja_env.get_template(template)   # compiled outside the timing
+        for _ in range(repeat):
+            start = time.perf_counter()
+            app.jinja_env.get_template(template).render(**context)
+            times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--classes", type=int, default=200)
+    parser.add_argument("--per-class", type=int, default=12, help="most students per class")
+    parser.add_argument("--students", type=int, default=50, help="rows on the student list page")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pages = {
+        "/classes (class_list.html)": ("class_list.html", {
+            "classes": make_classes(rng, args.classes, args.per_class)}),
+        "/students (student_list.html)": ("student_list.html", {
+            "students": make_students(rng, args.students), "q": "",
+            "page": {"prev_cursor": None, "next_cursor": "abc"}, "page_size": args.students}),
+        "/ (home.html)": ("home.html", {}),
+    }
+
+    with tempfile.TemporaryDirectory() as bytecode_dir:
+        cold_start(bytecode_dir)   # fill the cache
+        source = statistics.median(cold_start(None) for _ in range(5)) * 1000
+        cached = statistics.median(cold_start(bytecode_dir) for _ in range(5)) * 1000
+    print(f"cold start, all templates: {source:.1f} ms compiling, {cached:.1f} ms from bytecode cache "
+          f"({source / cached:.1f}x)\n")
+
+    print(f"{'page':<32}{'no fragments':>14}{'fragments':>12}{'saved':>9}")
+    for name, (template, context) in pages.items():
+        templatecache.enabled = False
+        plain = time_render(template, context, args.repeat)
+        templatecache.enabled = True
+        templatecache.invalidate()
+        cached = time_render(template, context, args.repeat)
+        print(f"{name:<32}{plain:>11.3f} ms{cached:>9.3f} ms{1 - cached / plain:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Benchmark: the compiled student validator vs the previous per-call one.
+
+Builds N synthetic CSV-like rows (mostly valid, some with each kind of
+error), checks both validators give the same clean data and messages for
+every row, then times them. Needs no database.
+
+    python benchmarks/bench_validation.py --rows 100000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import validation  # noqa: E402
+
+FIRST_NAMES = ["Emily", "Oliver", "Sophia", "Jack", "Isabella", "Noah", "Mia", "Lucas",
+               "Amelia", "Liam", "Charlotte", "Leo", "Ava", "Hugo", "Mary-Jane", "Zoe"]
+LAST_NAMES = ["Wilson", "Brown", "Taylor", "Anderson", "Thomas", "Jackson", "O'Brien", "Harris",
+              "Martin", "Thompson", "Te Rangi", "Walker", "Young", "King", "Ngata", "Scott"]
+
+# Values that break one rule each: (field, value)
+BAD_VALUES = [
+    ("first_name", ""), ("first_name", "B"), ("first_name", "J0hn"), ("last_name", "Sm!th"),
+    ("last_name", "x" * 51), ("email", "no-at-sign"), ("email", "a@b"), ("email", "@example.com"),
+    ("phone", "123"), ("date_of_birth", ""), ("date_of_birth", "2015-02-30"),
+    ("date_of_birth", "1990-01-01"), ("enrollment_date", "2999-01-01"), ("enrollment_date", "soon"),
+]
+
+
+def legacy_validate_student_form(form):
+    # validate_student_form as it was before the compiled validator
+    errors = []
+    first_name = (form.get('first_name') or '').strip()
+    last_name = (form.get('last_name') or '').strip()
+
+    def validate_name(value, label):
+        if not value:
+            errors.append(f"{label} is required.")
+            return
+        if len(value) < 2:
+            errors.append(f"{label} must be at least 2 characters.")
+            return
+        if len(value) > 50:
+            errors.append(f"{label} must be 50 characters or fewer.")
+            return
+        if any(ch.isdigit() for ch in value):
+            errors.append(f"{label} cannot contain numbers.")
+            return
+        allowed_extra = set(" -'")
+        for ch in value:
+            if ch.isalpha() or ch in allowed_extra:
+                continue
+            errors.append(f"{label} can only contain letters, spaces, hyphens, or apostrophes.")
+            return
+
+    validate_name(first_name, "First name")
+    validate_name(last_name, "Last name")
+
+    email = (form.get('email') or '').strip()
+    if email:
+        if email.count("@") != 1:
+            errors.append("Email must contain one '@'.")
+        else:
+            local, domain = email.split("@")
+            if not local:
+                errors.append("Email is missing the part before '@'.")
+            elif not domain:
+                errors.append("Email is missing the domain after '@'.")
+            elif domain.startswith(".") or domain.endswith("."):
+                errors.append("Email domain cannot start or end with a dot '.'.")
+            elif "." not in domain:
+                errors.append("Email domain must contain a dot (e.g., example.com).")
+
+    phone = (form.get('phone') or '').strip()
+    if phone:
+        if len("".join(ch for ch in phone if ch.isdigit())) < 6:
+            errors.append("Phone must contain at least 6 digits.")
+
+    dob_raw = (form.get('date_of_birth') or '').strip()
+    dob = None
+    if not dob_raw:
+        errors.append("Date of birth is required.")
+    else:
+        try:
+            dob = datetime.strptime(dob_raw, "%Y-%m-%d").date()
+        except ValueError:
+            errors.append("Please select a valid date of birth.")
+        else:
+            today = date.today()
+            try:
+                min_dob = date(today.year - 20, today.month, today.day)
+            except ValueError:
+                min_dob = date(today.year - 20, today.month, 28)
+            try:
+                max_dob = date(today.year - 1, today.month, today.day)
+            except ValueError:
+                max_dob = date(today.year - 1, today.month, 28)
+            if dob > max_dob:
+                errors.append("Student must be at least 1 year old.")
+            elif dob < min_dob:
+                errors.append("Date of birth must be within the last 20 years.")
+
+    enrollment_date_raw = (form.get('enrollment_date') or '').strip()
+    if enrollment_date_raw:
+        try:
+            ed = datetime.strptime(enrollment_date_raw, "%Y-%m-%d").date()
+        except ValueError:
+            errors.append("Please select a valid enrollment date.")
+            enrollment_date = None
+        else:
+            if ed > date.today():
+                errors.append("Enrollment date cannot be in the future.")
+                enrollment_date = None
+            else:
+                enrollment_date = ed.isoformat()
+    else:
+        enrollment_date = date.today().isoformat()
+
+    clean = {
+        "first_name": first_name,
+        "last_name": last_name,
+        "email": email or None,
+        "phone": phone or None,
+        "date_of_birth": dob.isoformat() if dob else None,
+        "enrollment_date": enrollment_date,
+    }
+    return clean, errors
+
+
+def make_rows(count, bad_share, seed):
+    rng = random.Random(seed)
+    today = date.today()
+    rows = []
+    for n in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        dob = today - timedelta(days=rng.randint(3 * 365, 19 * 365))
+        row = {
+            "first_name": first,
+            "last_name": last,
+            "email": f"{first.lower()}.{n}@email.com",
+            "phone": f"021 {rng.randint(100, 999)} {rng.randint(1000, 9999)}",
+            "date_of_birth": dob.isoformat(),
+            "enrollment_date": (today - timedelta(days=rng.randint(0, 700))).isoformat(),
+        }
+        if rng.random() < bad_share:
+            field, value = rng.choice(BAD_VALUES)
+            row[field] = value
+        rows.append(row)
+    return rows
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--bad", type=float, default=0.1, help="share of rows with one invalid field")
+    parser.add_argument("--repeat", type=int, default=3, help="best of N runs")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows, args.bad, args.seed)
+    print(f"{len(rows)} rows, {args.bad:.0%} with an invalid field")
+
+    runs = {
+        "legacy (per call)": lambda: [legacy_validate_student_form(r) for r in rows],
+        "validate_student_form": lambda: [validation.validate_student_form(r) for r in rows],
+        "STUDENT_FORM.validate_many": lambda: [
+            (clean, validation.flat_errors(errors))
+            for _row, clean, errors in validation.STUDENT_FORM.validate_many(rows)],
+    }
+
+    results, best = {}, {}
+    for name, fn in runs.items():
+        times = []
+        for _ in range(args.repeat):
+            results[name], elapsed = timed(fn)
+            times.append(elapsed)
+        best[name] = min(times)
+
+    baseline = results["legacy (per call)"]
+    for name, result in results.items():
+        if result != baseline:
+            sys.exit(f"{name}: results differ from the legacy validator")
+    print("all validators agree on every row\n")
+
+    base = best["legacy (per call)"]
+    print(f"{'validator':<30}{'total s':>10}{'rows/s':>12}{'speedup':>10}")
+    for name, elapsed in best.items():
+        print(f"{name:<30}{elapsed:>10.3f}{len(rows) / elapsed:>12,.0f}{base / elapsed:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
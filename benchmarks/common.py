@@ -0,0 +1,43 @@
+"""Shared helpers for the benchmark scripts (scratch database setup)."""
+
+import os
+import re
+import sys
+
+import MySQLdb
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import connect  # noqa: E402
+
+SCHEMA_FILE = os.path.join(ROOT, "sds_pa.sql")
+
+
+def connect_scratch(database, recreate=False):
+    """Connect to a scratch database (created if missing) using connect.py credentials."""
+    conn = MySQLdb.connect(user=connect.dbuser, password=connect.dbpass, host=connect.dbhost,
+                           port=connect.dbport)
+    cur = conn.cursor()
+    if recreate:
+        cur.execute(f"DROP DATABASE IF EXISTS `{database}`;")
+    cur.execute(f"CREATE DATABASE IF NOT EXISTS `{database}`;")
+    cur.close()
+    conn.select_db(database)
+    return conn
+
+
+def sql_statements(path=SCHEMA_FILE):
+    """Statements of an SQL script, with -- comments removed."""
+    with open(path, encoding="utf-8") as f:
+        text = re.sub(r"--[^\n]*", "", f.read())
+    return [stmt.strip() for stmt in text.split(";") if stmt.strip()]
+
+
+def load_schema(conn, path=SCHEMA_FILE):
+    """Create the SDS tables and seed rows in the connected database."""
+    cur = conn.cursor()
+    for stmt in sql_statements(path):
+        cur.execute(stmt)
+    conn.commit()
+    cur.close()
@@ -0,0 +1,262 @@
+"""
+Load test: latency percentiles and throughput for the main routes.
+
+Seeds a scratch database (default `sds_bench_load`) with datagen.py at the
+given scale, serves the app from it in-process, then runs every scenario
+with --clients concurrent HTTP clients for --duration seconds. Results are
+written as JSON (with the git commit) so runs can be compared:
+
+    python benchmarks/load_test.py --students 20000 --clients 8 --duration 10
+    python benchmarks/load_test.py --compare benchmarks/results/<earlier run>.json
+
+Use --url to load-test a server that is already running (no seeding;
+student ids are read from its database via connect.py).
+"""
+
+import argparse
+import datetime
+import http.client
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import make_server
+
+from common import ROOT, connect_scratch, load_schema
+
+import connect                  # noqa: E402
+import app as sds_app           # noqa: E402
+import datagen                  # noqa: E402
+import db                       # noqa: E402
+import querycache               # noqa: E402
+import refdata                  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+SEARCH_TERMS = ["wil", "brown", "em", "o'brien", "liam", "thomas", "zzz"]
+
+
+# ==============================
+# Seeding
+# ==============================
+
+def seed(conn, args):
+    """Fill the scratch database with datagen at the requested scale."""
+    conn.autocommit(False)
+    with sds_app.app.app_context():
+        totals = datagen.generate(conn, students=args.students, teachers=args.teachers, classes=args.classes,
+                                  max_enrolments=args.enrolments, seed=args.seed)
+    print(", ".join(f"{n} {table}" for table, n in totals.items()))
+
+
+def existing_ids():
+    # {"students": [...], "classes": [...]} from the app's database
+    with sds_app.app.app_context():
+        cur = db.get_cursor()
+        cur.execute("SELECT student_id FROM students;")
+        students = [r["student_id"] for r in cur.fetchall()]
+        cur.execute("SELECT class_id FROM classes;")
+        classes = [r["class_id"] for r in cur.fetchall()]
+        cur.close()
+    return {"students": students, "classes": classes}
+
+
+# ==============================
+# Scenarios
+# ==============================
+
+def edit_form(rng, sid):
+    first, last = rng.choice(datagen.FIRST_NAMES), rng.choice(datagen.LAST_NAMES)
+    return {
+        "student_id": sid, "first_name": first, "last_name": last,
+        "email": f"student.{sid}@email.com", "phone": "021 000 0000",
+        "date_of_birth": "2015-05-15", "enrollment_date": "2024-01-01",
+    }
+
+
+# name -> function(rng, ids) returning (method, path, form or None)
+SCENARIOS = {
+    "students": lambda rng, ids: ("GET", "/students", None),
+    "students_search": lambda rng, ids: (
+        "GET", "/students?" + urllib.parse.urlencode({"q": rng.choice(SEARCH_TERMS)}), None),
+    "classes": lambda rng, ids: ("GET", "/classes", None),
+    "teacher_report": lambda rng, ids: ("GET", "/teachers/report", None),
+    "class_summary": lambda rng, ids: (
+        "GET", f"/student/class-summary?student_id={rng.choice(ids['students'])}", None),
+    "enrol_get": lambda rng, ids: ("GET", f"/student/enrol?student_id={rng.choice(ids['students'])}", None),
+    "enrol_post": lambda rng, ids: (
+        "POST", "/student/enrol",
+        {"student_id": rng.choice(ids["students"]), "class_id": rng.choice(ids["classes"])}),
+    "edit_post": lambda rng, ids: ("POST", "/student/edit", edit_form(rng, rng.choice(ids["students"]))),
+}
+
+
+def request_once(host, port, method, path, form):
+    # One request on a fresh connection; returns (status, seconds)
+    body = urllib.parse.urlencode(form) if form else None
+    headers = {"Content-Type": "application/x-www-form-urlencoded"} if form else {}
+    start = time.perf_counter()
+    conn = http.client.HTTPConnection(host, port, timeout=60)
+    try:
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        return response.status, time.perf_counter() - start
+    finally:
+        conn.close()
+
+
+def run_scenario(name, host, port, ids, clients, duration, seed_value):
+    make_request = SCENARIOS[name]
+    deadline = time.perf_counter() + duration
+
+    def client(n):
+        rng = random.Random(f"{seed_value}-{name}-{n}")
+        timings, errors = [], 0
+        while time.perf_counter() < deadline:
+            method, path, form = make_request(rng, ids)
+            try:
+                status, elapsed = request_once(host, port, method, path, form)
+            except OSError:
+                errors += 1
+                continue
+            if status >= 400:
+                errors += 1
+            timings.append(elapsed)
+        return timings, errors
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(client, range(clients)))
+    wall = time.perf_counter() - start
+
+    timings = sorted(t for ts, _e in results for t in ts)
+    errors = sum(e for _ts, e in results)
+    return summarise(timings, errors, wall)
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarise(timings, errors, wall):
+    ms = [t * 1000 for t in timings]
+    return {
+        "requests": len(ms),
+        "errors": errors,
+        "throughput_rps": round(len(ms) / wall, 1) if wall else 0,
+        "mean_ms": round(statistics.fmean(ms), 2) if ms else None,
+        **{f"p{p}_ms": round(percentile(ms, p), 2) if ms else None for p in (50, 90, 95, 99)},
+        "max_ms": round(ms[-1], 2) if ms else None,
+    }
+
+
+# ==============================
+# Results
+# ==============================
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(results, baseline=None):
+    print(f"\n{'scenario':<18}{'req':>7}{'err':>5}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}"
+          + ("   p95 vs baseline" if baseline else ""))
+    for name, r in results.items():
+        line = (f"{name:<18}{r['requests']:>7}{r['errors']:>5}{r['throughput_rps']:>9}"
+                f"{r['p50_ms'] or 0:>9.1f}{r['p95_ms'] or 0:>9.1f}{r['p99_ms'] or 0:>9.1f}")
+        old = (baseline or {}).get(name)
+        if old and old.get("p95_ms") and r["p95_ms"]:
+            line += f"   {r['p95_ms'] / old['p95_ms'] - 1:+.0%}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=5000, help="synthetic students to seed")
+    parser.add_argument("--teachers", type=int, default=20)
+    parser.add_argument("--classes", type=int, default=100)
+    parser.add_argument("--enrolments", type=int, default=3, help="enrolments per seeded student (at most)")
+    parser.add_argument("--database", default="sds_bench_load")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent HTTP clients")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per scenario")
+    parser.add_argument("--pool-size", type=int, default=10, help="app connection pool max size")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=1, help="random seed (data and requests)")
+    parser.add_argument("--url", help="test a running server instead (e.g. http://127.0.0.1:5000)")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare p95 latency against")
+    args = parser.parse_args()
+
+    # Per-request SQL summaries and access logs would swamp the output
+    logging.getLogger("sds.sql").setLevel(logging.ERROR)
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    server = None
+    if args.url:
+        target = urllib.parse.urlsplit(args.url)
+        host, port = target.hostname, target.port or 80
+    else:
+        conn = connect_scratch(args.database, recreate=True)
+        load_schema(conn)
+        seed(conn, args)
+        conn.close()
+
+        # Point the app at the scratch database and serve it on a free port
+        db.init_db(sds_app.app, connect.dbuser, connect.dbpass, connect.dbhost, args.database, connect.dbport,
+                   pool_max_size=args.pool_size)
+        refdata.invalidate()
+        querycache.invalidate()
+        server = make_server("127.0.0.1", 0, sds_app.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = "127.0.0.1", server.server_port
+
+    ids = existing_ids()
+    print(f"{len(ids['students'])} students, {args.clients} clients, {args.duration:g}s per scenario")
+
+    results = {}
+    for name in args.scenarios:
+        results[name] = run_scenario(name, host, port, ids, args.clients, args.duration, args.seed)
+        print(f"  {name}: {results[name]['throughput_rps']} req/s, p95 {results[name]['p95_ms']} ms")
+
+    if server is not None:
+        server.shutdown()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    print_table(results, baseline)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{report['timestamp'].replace(':', '')[:17]}-{report['commit'] or 'nocommit'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nresults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
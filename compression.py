@@ -0,0 +1,171 @@
+"""
+gzip / Brotli response compression.
+
+Text responses (HTML, CSV, JSON, ...) of at least COMPRESS_MIN_SIZE bytes
+are compressed with the best encoding the browser accepts (Accept-Encoding):
+Brotli when the optional `brotli` package is installed, otherwise gzip.
+Streamed responses (/classes?stream=1, exports) are compressed chunk by
+chunk and flushed after each one, so the browser still gets the page
+progressively.
+
+Static files are never compressed per request. When a precompressed copy
+sits next to the file (hero.svg.br / hero.svg.gz) it is sent instead;
+`flask precompress-static` (also run by `flask build-assets`) writes them.
+"""
+
+import functools
+import gzip
+import mimetypes
+import os
+import zlib
+
+import click
+from flask import current_app, request, send_from_directory
+
+try:
+    import brotli
+except ImportError:   # gzip only
+    brotli = None
+
+# Mimetypes worth compressing (images / fonts are compressed already)
+COMPRESSIBLE = {
+    "text/html", "text/css", "text/csv", "text/plain", "text/javascript", "application/javascript",
+    "application/json", "application/x-ndjson", "image/svg+xml",
+}
+
+# File extensions precompressed by `flask precompress-static`
+PRECOMPRESS_EXTENSIONS = (".css", ".js", ".svg", ".json", ".txt", ".html", ".csv")
+
+# Encoding -> suffix of the precompressed file
+_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+def _encodings():
+    # Encodings this server can produce, best first
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def choose_encoding():
+    """Best encoding for this request's Accept-Encoding, or None."""
+    return request.accept_encodings.best_match(_encodings())
+
+
+def _compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=current_app.config["COMPRESS_BR_QUALITY"])
+    return gzip.compress(data, compresslevel=current_app.config["COMPRESS_LEVEL"], mtime=0)
+
+
+def _compress_stream(body, chunks, encoding, level, quality):
+    # Compress each chunk and flush it, so streamed pages still arrive progressively.
+    # `body` is the original iterable, closed when the client is done.
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=quality)
+        compress, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)   # 31 = gzip container
+        compress, finish = compressor.compress, compressor.flush
+        flush = functools.partial(compressor.flush, zlib.Z_SYNC_FLUSH)
+
+    try:
+        for chunk in chunks:
+            if chunk:
+                yield compress(chunk) + flush()
+        yield finish()
+    finally:
+        if hasattr(body, "close"):
+            body.close()
+
+
+def _vary(response):
+    response.vary.add("Accept-Encoding")
+
+
+def compress_response(response):
+    """after_request hook: compress eligible responses for this browser."""
+    if (response.status_code < 200 or response.status_code in (204, 304) or response.direct_passthrough
+            or "Content-Encoding" in response.headers or response.mimetype not in COMPRESSIBLE):
+        return response
+    _vary(response)
+
+    encoding = choose_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        config = current_app.config
+        response.response = _compress_stream(response.response, response.iter_encoded(), encoding,
+                                             config["COMPRESS_LEVEL"], config["COMPRESS_BR_QUALITY"])
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < current_app.config["COMPRESS_MIN_SIZE"]:
+            return response
+        response.set_data(_compress(data, encoding))
+
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+# ==============================
+# Static files
+# ==============================
+
+def _precompressed_static(static_view):
+    """Wrap the static view to send file.br / file.gz when present and accepted."""
+
+    @functools.wraps(static_view)
+    def view(filename):
+        static_folder = current_app.static_folder
+        for encoding in _encodings():
+            path = filename + _SUFFIXES[encoding]
+            if (request.accept_encodings[encoding]
+                    and os.path.isfile(os.path.join(static_folder, path))):
+                response = send_from_directory(static_folder, path, mimetype=mimetypes.guess_type(filename)[0])
+                response.headers["Content-Encoding"] = encoding
+                _vary(response)
+                return response
+        response = static_view(filename=filename)
+        if filename.endswith(PRECOMPRESS_EXTENSIONS):
+            _vary(response)
+        return response
+
+    return view
+
+
+def precompress(folder):
+    """Write .gz (and .br) copies of the text files in `folder`. Returns the files written."""
+    written = []
+    for root, _dirs, files in os.walk(folder):
+        for name in sorted(files):
+            if not name.endswith(PRECOMPRESS_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                data = f.read()
+
+            outputs = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                outputs[".br"] = brotli.compress(data, quality=11)
+            for suffix, compressed in outputs.items():
+                if len(compressed) >= len(data):
+                    continue   # not worth it; the plain file is served
+                with open(path + suffix, "wb") as f:
+                    f.write(compressed)
+                written.append(path + suffix)
+    return written
+
+
+def init_app(app):
+    """Compress responses and serve precompressed static files; register `flask precompress-static`."""
+    if app.config["COMPRESS"]:
+        app.after_request(compress_response)
+        app.view_functions["static"] = _precompressed_static(app.view_functions["static"])
+
+    @app.cli.command("precompress-static")
+    def precompress_static_command():
+        """Write .gz / .br copies of static text files (served instead of compressing per request)."""
+        written = precompress(app.static_folder)
+        for path in written:
+            click.echo(os.path.relpath(path, app.static_folder))
+        click.echo(f"{len(written)} file(s) written{'' if brotli else ' (install brotli for .br)'}.")
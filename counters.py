@@ -0,0 +1,236 @@
+"""
+Incrementally maintained enrolment counters for the teacher report.
+
+- classenrolmentcounts: students enrolled per class
+- teacherstudents: how many of a teacher's classes each student is in
+- teacherstudentcounts: distinct students per teacher (rows in teacherstudents)
+
+Every insert into / delete from studentclasses must be followed by
+record_enrolments() / record_unenrolments() in the same transaction.
+`flask rebuild-enrolment-counters` recomputes everything from studentclasses
+(e.g. after bulk SQL loads or cascading deletes of students / classes).
+"""
+
+from collections import Counter
+
+import click
+
+import db
+import versions
+
+# Teacher report rows: every class per teacher with its counters
+# (LEFT JOIN keeps teachers without classes)
+REPORT_QUERY = """
+    SELECT
+        t.teacher_id,
+        t.first_name,
+        t.last_name,
+        COALESCE(tc.student_count, 0) AS total_students,
+        c.class_id,
+        c.class_name,
+        COALESCE(cc.student_count, 0) AS student_count
+    FROM teachers t
+    LEFT JOIN teacherstudentcounts tc ON tc.teacher_id = t.teacher_id
+    LEFT JOIN classes c ON c.teacher_id = t.teacher_id
+    LEFT JOIN classenrolmentcounts cc ON cc.class_id = c.class_id
+    ORDER BY
+        t.last_name,
+        t.first_name,
+        t.teacher_id,
+        c.class_name;
+"""
+
+
+def _class_teachers(cur, class_ids):
+    # class_id -> teacher_id for the given classes
+    placeholders = ", ".join(["%s"] * len(class_ids))
+    cur.execute(f"""
+        SELECT class_id, teacher_id
+        FROM classes
+        WHERE class_id IN ({placeholders});
+    """, list(class_ids))
+    return {r["class_id"]: r["teacher_id"] for r in cur.fetchall()}
+
+
+def _pair_condition(pairs):
+    # "(a, b) IN ((%s, %s), ...)" parameters, flattened
+    params = []
+    for a, b in pairs:
+        params.extend([a, b])
+    return ", ".join(["(%s, %s)"] * len(pairs)), params
+
+
+def record_enrolments(cur, pairs):
+    """
+    Update counters for newly inserted (student_id, class_id) enrolments.
+    Uses a constant number of statements however many pairs are given.
+    """
+    pairs = [(int(sid), int(cid)) for sid, cid in pairs]
+    if not pairs:
+        return
+
+    teachers = _class_teachers(cur, {cid for _sid, cid in pairs})
+    class_deltas = Counter(cid for _sid, cid in pairs)
+    pair_deltas = Counter((teachers[cid], sid) for sid, cid in pairs)
+
+    cur.executemany("""
+        INSERT INTO classenrolmentcounts (class_id, student_count)
+        VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE student_count = student_count + VALUES(student_count);
+    """, sorted(class_deltas.items()))
+
+    cur.executemany("""
+        INSERT INTO teacherstudents (teacher_id, student_id, enrolment_count)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE enrolment_count = enrolment_count + VALUES(enrolment_count);
+    """, [(tid, sid, n) for (tid, sid), n in sorted(pair_deltas.items())])
+
+    # A (teacher, student) pair is new if its count is exactly what we just added.
+    # The upsert above holds row locks, so concurrent enrolments can't both see it as new.
+    placeholders, params = _pair_condition(sorted(pair_deltas))
+    cur.execute(f"""
+        SELECT teacher_id, student_id, enrolment_count
+        FROM teacherstudents
+        WHERE (teacher_id, student_id) IN ({placeholders});
+    """, params)
+    teacher_deltas = Counter(
+        r["teacher_id"] for r in cur.fetchall()
+        if r["enrolment_count"] == pair_deltas[(r["teacher_id"], r["student_id"])])
+
+    if teacher_deltas:
+        cur.executemany("""
+            INSERT INTO teacherstudentcounts (teacher_id, student_count)
+            VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE student_count = student_count + VALUES(student_count);
+        """, sorted(teacher_deltas.items()))
+
+
+def record_unenrolments(cur, pairs):
+    """Update counters for deleted (student_id, class_id) enrolments."""
+    pairs = [(int(sid), int(cid)) for sid, cid in pairs]
+    if not pairs:
+        return
+
+    teachers = _class_teachers(cur, {cid for _sid, cid in pairs})
+    class_deltas = Counter(cid for _sid, cid in pairs)
+    pair_deltas = Counter((teachers[cid], sid) for sid, cid in pairs)
+
+    cur.executemany("""
+        UPDATE classenrolmentcounts
+        SET student_count = GREATEST(student_count - %s, 0)
+        WHERE class_id = %s;
+    """, [(n, cid) for cid, n in sorted(class_deltas.items())])
+
+    cur.executemany("""
+        UPDATE teacherstudents
+        SET enrolment_count = enrolment_count - %s
+        WHERE teacher_id = %s AND student_id = %s;
+    """, [(n, tid, sid) for (tid, sid), n in sorted(pair_deltas.items())])
+
+    # Pairs that dropped to zero: the student no longer has any class with that teacher
+    placeholders, params = _pair_condition(sorted(pair_deltas))
+    cur.execute(f"""
+        SELECT teacher_id, student_id
+        FROM teacherstudents
+        WHERE (teacher_id, student_id) IN ({placeholders})
+          AND enrolment_count <= 0;
+    """, params)
+    gone = [(r["teacher_id"], r["student_id"]) for r in cur.fetchall()]
+    if not gone:
+        return
+
+    placeholders, params = _pair_condition(gone)
+    cur.execute(f"""
+        DELETE FROM teacherstudents
+        WHERE (teacher_id, student_id) IN ({placeholders});
+    """, params)
+
+    cur.executemany("""
+        UPDATE teacherstudentcounts
+        SET student_count = GREATEST(student_count - %s, 0)
+        WHERE teacher_id = %s;
+    """, [(n, tid) for tid, n in sorted(Counter(tid for tid, _sid in gone).items())])
+
+
+def rebuild(cur):
+    """Recompute all counters from studentclasses."""
+    cur.execute("DELETE FROM classenrolmentcounts;")
+    cur.execute("""
+        INSERT INTO classenrolmentcounts (class_id, student_count)
+        SELECT c.class_id, COUNT(sc.student_id)
+        FROM classes c
+        LEFT JOIN studentclasses sc ON sc.class_id = c.class_id
+        GROUP BY c.class_id;
+    """)
+
+    cur.execute("DELETE FROM teacherstudents;")
+    cur.execute("""
+        INSERT INTO teacherstudents (teacher_id, student_id, enrolment_count)
+        SELECT c.teacher_id, sc.student_id, COUNT(*)
+        FROM studentclasses sc
+        JOIN classes c ON c.class_id = sc.class_id
+        GROUP BY c.teacher_id, sc.student_id;
+    """)
+
+    cur.execute("DELETE FROM teacherstudentcounts;")
+    cur.execute("""
+        INSERT INTO teacherstudentcounts (teacher_id, student_count)
+        SELECT t.teacher_id, COUNT(ts.student_id)
+        FROM teachers t
+        LEFT JOIN teacherstudents ts ON ts.teacher_id = t.teacher_id
+        GROUP BY t.teacher_id;
+    """)
+
+
+def check(cur):
+    """
+    Compare stored counters with fresh aggregates.
+    Returns a list of (kind, id, stored, actual) for every mismatch.
+    """
+    mismatches = []
+
+    cur.execute("""
+        SELECT c.class_id AS id, COALESCE(cc.student_count, 0) AS stored, COUNT(sc.student_id) AS actual
+        FROM classes c
+        LEFT JOIN classenrolmentcounts cc ON cc.class_id = c.class_id
+        LEFT JOIN studentclasses sc ON sc.class_id = c.class_id
+        GROUP BY c.class_id, cc.student_count
+        HAVING stored <> actual;
+    """)
+    mismatches.extend(("class", r["id"], r["stored"], r["actual"]) for r in cur.fetchall())
+
+    cur.execute("""
+        SELECT t.teacher_id AS id, COALESCE(tc.student_count, 0) AS stored,
+               COUNT(DISTINCT sc.student_id) AS actual
+        FROM teachers t
+        LEFT JOIN teacherstudentcounts tc ON tc.teacher_id = t.teacher_id
+        LEFT JOIN classes c ON c.teacher_id = t.teacher_id
+        LEFT JOIN studentclasses sc ON sc.class_id = c.class_id
+        GROUP BY t.teacher_id, tc.student_count
+        HAVING stored <> actual;
+    """)
+    mismatches.extend(("teacher", r["id"], r["stored"], r["actual"]) for r in cur.fetchall())
+
+    return mismatches
+
+
+def init_app(app):
+    """Register the `flask rebuild-enrolment-counters` command."""
+
+    @app.cli.command("rebuild-enrolment-counters")
+    @click.option("--check-only", is_flag=True, help="Report mismatches without rebuilding.")
+    def rebuild_enrolment_counters_command(check_only):
+        """Reconcile the teacher report counters with studentclasses."""
+        cur = db.get_cursor()
+        mismatches = check(cur)
+        for kind, key, stored, actual in mismatches:
+            click.echo(f"{kind} {key}: stored {stored}, actual {actual}")
+        click.echo(f"{len(mismatches)} counter(s) out of date.")
+
+        if not check_only:
+            with db.transaction():
+                rebuild(cur)
+                # Pages built from the counters key on studentclasses
+                versions.bump(cur, "studentclasses")
+            click.echo("Enrolment counters rebuilt.")
+        cur.close()
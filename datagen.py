@@ -0,0 +1,271 @@
+"""
+Deterministic synthetic data for the SDS schema, at any scale.
+
+    flask --app app generate-data --students 1000000 --teachers 200 --classes 2000 --seed 42
+
+Generates teachers with the dance types they teach (teacherdancetypes),
+classes taught by a teacher of the class's dance type, students with a
+grade history per dance type, and enrolments that pass the student_enrol
+rule: a class in a dance type the student has a grade in, at the student's
+current (highest) grade level or one above. The same seed, scale and
+--as-of date always produce the same rows.
+
+Students are generated and written in chunks (multi-row INSERTs, or
+LOAD DATA LOCAL INFILE with --load-data), so memory stays bounded at any
+scale. The search index, enrolment counters and page versions are rebuilt
+at the end.
+"""
+
+import csv
+import datetime
+import os
+import random
+import tempfile
+import time
+
+import click
+import MySQLdb
+
+import counters
+import db
+import search
+import versions
+
+FIRST_NAMES = [
+    "Emily", "Oliver", "Sophia", "Jack", "Isabella", "Noah", "Mia", "Lucas", "Amelia", "Liam",
+    "Charlotte", "Leo", "Ava", "Hugo", "Isla", "Mason", "Harper", "Theo", "Ruby", "Arlo",
+    "Mary-Jane", "Zoe", "Finn", "Aria", "Grace", "Ethan", "Lily", "James", "Chloe", "Henry",
+    "Ella", "George", "Aroha", "Nikau", "Mila", "Kai", "Evie", "Luca", "Sienna", "Oscar",
+]
+LAST_NAMES = [
+    "Wilson", "Brown", "Taylor", "Anderson", "Thomas", "Jackson", "White", "Harris", "Martin",
+    "Thompson", "O'Brien", "Walker", "Young", "King", "Wright", "Scott", "Green", "Baker",
+    "Adams", "Nelson", "Carter", "Mitchell", "Roberts", "Ngata", "Campbell", "Stewart", "Morris",
+    "Murphy", "Cook", "Rogers", "Patel", "Singh", "Chen", "Wang", "Kim", "Nguyen", "Te Rangi",
+    "McDonald", "Clarke", "Parata",
+]
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+
+
+def _email_part(name):
+    return "".join(ch for ch in name.lower() if ch.isalpha())
+
+
+def _phone(rng):
+    return f"02{rng.randint(0, 9)} {rng.randint(100, 999)} {rng.randint(1000, 9999)}"
+
+
+# ==============================
+# Row generators
+# ==============================
+
+def generate_teachers(rng, count, first_id, dancetype_ids):
+    """(teacher rows, teacherdancetype rows); teachers cycle through the dance types, so each has one."""
+    teachers, teaches = [], []
+    for n in range(count):
+        tid = first_id + n
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        teachers.append((tid, first, last,
+                         f"{_email_part(first)}.{_email_part(last)}.{tid}@danceschool.com", _phone(rng)))
+        styles = {dancetype_ids[n % len(dancetype_ids)]}
+        styles.update(rng.sample(dancetype_ids, rng.randint(0, min(2, len(dancetype_ids)))))
+        teaches.extend((tid, dtid) for dtid in sorted(styles))
+    return teachers, teaches
+
+
+def generate_classes(rng, count, first_id, teaches, dancetypes, grades):
+    """
+    Class rows, plus the catalogue {(dancetype_id, grade_level): [class_id, ...]}
+    used to pick eligible enrolments.
+    """
+    teachers_for = {}
+    for tid, dtid in teaches:
+        teachers_for.setdefault(dtid, []).append(tid)
+    if count and not teachers_for:
+        raise click.ClickException("Classes need teachers: use --teachers 1 or more.")
+
+    dancetype_ids = sorted(teachers_for)
+    classes, catalogue = [], {}
+    for n in range(count):
+        cid = first_id + n
+        # Cycle through dance type / grade so every level has classes before any repeats
+        dtid = dancetype_ids[n % len(dancetype_ids)]
+        grade = grades[(n // len(dancetype_ids)) % len(grades)]
+        tid = rng.choice(teachers_for[dtid])
+        hour, minute = rng.randint(9, 19), rng.choice((0, 30))
+        classes.append((cid, f"{dancetypes[dtid]} {grade['grade_name']} #{cid}", dtid, grade["grade_id"], tid,
+                        rng.choice(DAYS), f"{hour:02d}:{minute:02d}:00"))
+        catalogue.setdefault((dtid, grade["grade_level"]), []).append(cid)
+    return classes, catalogue
+
+
+def generate_students(rng, count, first_id, dancetype_ids, grades, catalogue, max_enrolments, as_of,
+                      chunk_size):
+    """
+    Yield (student rows, studentgrade rows, studentclass rows) for each chunk
+    of `chunk_size` students.
+    """
+    by_level = sorted(grades, key=lambda g: g["grade_level"])
+    # Beginners are more common than advanced students
+    level_weights = [len(by_level) - i for i in range(len(by_level))]
+
+    for chunk_start in range(0, count, chunk_size):
+        students, student_grades, enrolments = [], [], []
+        for sid in range(first_id + chunk_start, first_id + min(count, chunk_start + chunk_size)):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            dob = as_of - datetime.timedelta(days=rng.randint(3 * 365, 19 * 365))
+            joined = as_of - datetime.timedelta(days=rng.randint(0, (as_of - dob).days - 2 * 365))
+            students.append((sid, first, last, f"{_email_part(first)}.{_email_part(last)}{sid}@email.com",
+                             _phone(rng), dob.isoformat(), joined.isoformat()))
+
+            eligible = []
+            for dtid in rng.sample(dancetype_ids, rng.randint(1, min(3, len(dancetype_ids)))):
+                index = rng.choices(range(len(by_level)), weights=level_weights)[0]
+                current = by_level[index]
+                student_grades.append((sid, current["grade_id"], dtid))
+                # Earlier grade kept as history; the current one is still the highest level
+                if index > 0 and rng.random() < 0.5:
+                    student_grades.append((sid, by_level[index - 1]["grade_id"], dtid))
+
+                level = current["grade_level"]
+                eligible.extend(catalogue.get((dtid, level), []))
+                eligible.extend(catalogue.get((dtid, level + 1), []))
+
+            take = min(len(eligible), rng.randint(0, max_enrolments))
+            enrolments.extend((sid, cid) for cid in sorted(rng.sample(eligible, take)))
+
+        yield students, student_grades, enrolments
+
+
+# ==============================
+# Writing
+# ==============================
+
+COLUMNS = {
+    "teachers": ("teacher_id", "first_name", "last_name", "email", "phone"),
+    "teacherdancetypes": ("teacher_id", "dancetype_id"),
+    "classes": ("class_id", "class_name", "dancetype_id", "grade_id", "teacher_id", "schedule_day", "schedule_time"),
+    "students": ("student_id", "first_name", "last_name", "email", "phone", "date_of_birth", "enrollment_date"),
+    "studentgrades": ("student_id", "grade_id", "dancetype_id"),
+    "studentclasses": ("student_id", "class_id"),
+}
+
+
+def write_rows(cur, table, rows, batch_size=5000, load_data=False):
+    """Write rows to `table` with multi-row INSERTs, or one LOAD DATA LOCAL INFILE."""
+    if not rows:
+        return
+    columns = COLUMNS[table]
+
+    if load_data:
+        with tempfile.NamedTemporaryFile("w", suffix=".tsv", delete=False, encoding="utf-8", newline="") as f:
+            csv.writer(f, delimiter="\t", lineterminator="\n", quoting=csv.QUOTE_NONE,
+                       escapechar="\\").writerows(rows)
+        try:
+            cur.execute(f"""
+                LOAD DATA LOCAL INFILE %s INTO TABLE {table}
+                FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n'
+                ({", ".join(columns)});
+            """, (f.name,))
+        finally:
+            os.unlink(f.name)
+        return
+
+    sql = f"""
+        INSERT INTO {table} ({", ".join(columns)})
+        VALUES ({", ".join(["%s"] * len(columns))});
+    """
+    for start in range(0, len(rows), batch_size):
+        cur.executemany(sql, rows[start:start + batch_size])
+
+
+def _next_id(cur, table, column):
+    cur.execute(f"SELECT COALESCE(MAX({column}), 0) + 1 FROM {table};")
+    return cur.fetchone()[0]
+
+
+def generate(conn, students=1000, teachers=20, classes=100, max_enrolments=3, seed=1,
+             as_of=None, chunk_size=10000, load_data=False, progress=None):
+    """
+    Generate and write a data set on `conn` (tuple cursor, autocommit off).
+    New ids continue after any existing rows. Returns row counts per table.
+    Needs an app context (search index / page versions).
+    """
+    rng = random.Random(seed)
+    as_of = as_of or datetime.date.today()
+    cur = conn.cursor()
+    totals = dict.fromkeys(COLUMNS, 0)
+
+    cur.execute("SELECT dancetype_id, dancetype_name FROM dancetype ORDER BY dancetype_id;")
+    dancetypes = dict(cur.fetchall())
+    cur.execute("""
+        SELECT grade_id, grade_name, grade_level
+        FROM grades
+        WHERE grade_level IS NOT NULL
+        ORDER BY grade_level, grade_id;
+    """)
+    grades = [{"grade_id": r[0], "grade_name": r[1], "grade_level": r[2]} for r in cur.fetchall()]
+    if not dancetypes or not grades:
+        raise click.ClickException("Load the dancetype and grades reference rows first (sds_local.sql).")
+
+    teacher_rows, teaches = generate_teachers(rng, teachers, _next_id(cur, "teachers", "teacher_id"),
+                                              sorted(dancetypes))
+    class_rows, catalogue = generate_classes(rng, classes, _next_id(cur, "classes", "class_id"),
+                                             teaches, dancetypes, grades)
+    for table, rows in (("teachers", teacher_rows), ("teacherdancetypes", teaches), ("classes", class_rows)):
+        write_rows(cur, table, rows, load_data=load_data)
+        totals[table] += len(rows)
+    conn.commit()
+
+    chunks = generate_students(rng, students, _next_id(cur, "students", "student_id"), sorted(dancetypes),
+                               grades, catalogue, max_enrolments, as_of, chunk_size)
+    for student_rows, grade_rows, enrol_rows in chunks:
+        for table, rows in (("students", student_rows), ("studentgrades", grade_rows),
+                            ("studentclasses", enrol_rows)):
+            write_rows(cur, table, rows, load_data=load_data)
+            totals[table] += len(rows)
+        conn.commit()
+        if progress:
+            progress(totals)
+
+    # Derived tables the pages read
+    counters.rebuild(cur)
+    versions.bump(cur, *versions.TABLES)
+    conn.commit()
+    search.rebuild_index(conn)
+    cur.close()
+    return totals
+
+
+def init_app(app):
+    """Register the `flask generate-data` command."""
+
+    @app.cli.command("generate-data")
+    @click.option("--students", default=1000, show_default=True)
+    @click.option("--teachers", default=20, show_default=True)
+    @click.option("--classes", default=100, show_default=True)
+    @click.option("--max-enrolments", default=3, show_default=True, help="Most classes per student.")
+    @click.option("--seed", default=1, show_default=True, help="Random seed (same seed, same data).")
+    @click.option("--as-of", type=click.DateTime(["%Y-%m-%d"]), help="Reference date for ages (default: today).")
+    @click.option("--chunk-size", default=10000, show_default=True, help="Students per chunk / transaction.")
+    @click.option("--load-data", is_flag=True, help="Use LOAD DATA LOCAL INFILE (server needs local_infile=ON).")
+    def generate_data_command(students, teachers, classes, max_enrolments, seed, as_of, chunk_size, load_data):
+        """Add synthetic teachers, classes, students, grades and enrolments."""
+        params = dict(db.connection_params, autocommit=False, cursorclass=db.Cursor)
+        if load_data:
+            params["local_infile"] = 1
+        conn = MySQLdb.connect(**params)
+        start = time.monotonic()
+
+        def progress(totals):
+            click.echo(f"  {totals['students']} students, {totals['studentclasses']} enrolments "
+                       f"({time.monotonic() - start:.0f}s)")
+
+        try:
+            totals = generate(conn, students, teachers, classes, max_enrolments, seed,
+                              as_of.date() if as_of else None, chunk_size, load_data, progress)
+        finally:
+            conn.close()
+        for table, n in totals.items():
+            click.echo(f"{table}: {n} rows")
+        click.echo(f"Done in {time.monotonic() - start:.0f}s.")
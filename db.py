@@ -1,11 +1,459 @@
 """MySQL database connectivity for Flask web app using mysqlclient."""
 
-from flask import Flask, g
+import functools
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from flask import Flask, g, has_app_context, has_request_context, request, session
 import MySQLdb
+import MySQLdb.cursors
+
+import applog
 
 # Database connection parameters
 connection_params = {}
 
+# Shared connection pool (created by init_db)
+_pool = None
+
+# Threads that run gather() queries on extra pooled connections (created by init_db)
+_executor = None
+
+# Read replicas (see init_db / replica_reads) and routing settings
+_replicas = []
+_replica_turn = 0
+_replica_fallbacks = 0
+read_your_writes_seconds = 5.0
+
+# Methods that never write; other requests pin the session to the primary for a while
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Per-request query summaries and repeated statements; slow queries go to their own logger
+sql_log = logging.getLogger("sds.sql")
+slow_log = logging.getLogger("sds.sql.slow")
+
+# Statements slower than this (milliseconds) are written to the slow-query log (None = off)
+slow_query_ms = None
+
+# Distinct statements remembered per request for the repeated-statement warning
+SEEN_MAX_STATEMENTS = 1000
+
+
+# ==============================
+# SQL instrumentation
+# ==============================
+
+_NUMBER = re.compile(r"\b\d+(\.\d+)?\b")
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"")
+_IN_LIST = re.compile(r"\(\s*(\?|%s)(\s*,\s*(\?|%s))+\s*\)")
+_LIST_OF_LISTS = re.compile(r"\(\.\.\.\)(\s*,\s*\(\.\.\.\))+")
+_SPACE = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """SQL with literals replaced by ? and IN lists collapsed, for grouping statements."""
+    if isinstance(sql, bytes):
+        sql = sql.decode("utf-8", "replace")
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("(...)", sql)
+    sql = _LIST_OF_LISTS.sub("(...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+def _record(query, args, elapsed, rows):
+    # Add one statement to the request's stats and the slow-query log.
+    # Only requests are counted: a CLI command runs in one long app context.
+    if has_request_context():
+        stats = g.get("sql_stats")
+        if stats is None:
+            stats = g.sql_stats = {"count": 0, "time": 0.0, "seen": Counter()}
+        stats["count"] += 1
+        stats["time"] += elapsed
+        key = (query, hash(repr(args)))
+        if key in stats["seen"] or len(stats["seen"]) < SEEN_MAX_STATEMENTS:
+            stats["seen"][key] += 1
+
+    if slow_query_ms is not None and elapsed * 1000 >= slow_query_ms:
+        slow_log.warning("%.1f ms rows=%s %s", elapsed * 1000, rows, fingerprint(query))
+
+
+class InstrumentedCursorMixin:
+    """Times every execute / executemany and records it in the request's SQL stats."""
+
+    _in_executemany = False
+
+    def execute(self, query, args=None):
+        # executemany may fall back to one execute per row; count the batch once
+        if self._in_executemany:
+            return super().execute(query, args)
+        start = time.perf_counter()
+        try:
+            return super().execute(query, args)
+        finally:
+            _record(query, args, time.perf_counter() - start, self.rowcount)
+
+    def executemany(self, query, args):
+        self._in_executemany = True
+        start = time.perf_counter()
+        try:
+            return super().executemany(query, args)
+        finally:
+            self._in_executemany = False
+            _record(query, args, time.perf_counter() - start, self.rowcount)
+
+
+class Cursor(InstrumentedCursorMixin, MySQLdb.cursors.Cursor):
+    pass
+
+
+class DictCursor(InstrumentedCursorMixin, MySQLdb.cursors.DictCursor):
+    pass
+
+
+class SSDictCursor(InstrumentedCursorMixin, MySQLdb.cursors.SSDictCursor):
+    pass
+
+
+def request_sql_stats():
+    """(query count, total seconds in the database) for the current request so far."""
+    stats = g.get("sql_stats") if has_app_context() else None
+    return (stats["count"], stats["time"]) if stats else (0, 0.0)
+
+
+def _add_sql_header(response):
+    # Server-Timing shows up in the browser's network panel
+    count, elapsed = request_sql_stats()
+    response.headers["Server-Timing"] = f'db;dur={elapsed * 1000:.1f};desc="{count} queries"'
+    response.headers["X-DB-Query-Count"] = str(count)
+    return response
+
+
+def _log_sql_stats(exception=None):
+    # One summary line per request, plus a warning for statements run more than once
+    stats = g.pop("sql_stats", None)
+    if not stats:
+        return
+    where = f"{request.method} {request.full_path.rstrip('?')}" if has_request_context() else "app context"
+    sql_log.info("%s: %d queries, %.1f ms in database", where, stats["count"], stats["time"] * 1000)
+    for (query, _args_hash), times in stats["seen"].items():
+        if times > 1:
+            sql_log.warning("%s: identical statement run %d times: %s", where, times, fingerprint(query))
+
+
+def init_instrumentation(app):
+    """
+    Per-request SQL stats from the app config:
+    - SQL_SLOW_QUERY_MS: slow-query threshold in milliseconds (None / negative = off)
+    - SQL_SLOW_QUERY_LOG: file for the slow-query log (default: the app's log output)
+    - SQL_STATS_HEADER: add Server-Timing / X-DB-Query-Count headers to responses
+    """
+    global slow_query_ms
+    threshold = app.config["SQL_SLOW_QUERY_MS"]
+    slow_query_ms = threshold if threshold is not None and threshold >= 0 else None
+
+    # Records go to the `sds` handlers set up by applog (off the request thread)
+    if app.config["SQL_SLOW_QUERY_LOG"]:
+        handler = logging.FileHandler(app.config["SQL_SLOW_QUERY_LOG"], encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s [%(request_id)s] %(message)s"))
+        slow_log.addHandler(applog.background(handler))
+        slow_log.propagate = False
+
+    if app.config["SQL_STATS_HEADER"]:
+        app.after_request(_add_sql_header)
+    app.teardown_request(_log_sql_stats)
+
+
+class PoolTimeout(MySQLdb.OperationalError):
+    """Raised when no pooled connection becomes free within the checkout timeout."""
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of MySQLdb connections.
+
+    - min_size: connections opened up front (lazily, on first checkout)
+    - max_size: hard limit on open connections; extra callers wait
+    - timeout: seconds a caller waits for a free connection before PoolTimeout
+    - max_age: seconds after which a connection is retired instead of reused
+    - health_check_interval: ping a borrowed connection if it sat idle longer
+      than this many seconds (0 = ping on every borrow)
+    """
+
+    def __init__(self, connect_kwargs, min_size=1, max_size=10, timeout=5.0,
+                 max_age=3600, health_check_interval=30):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1.")
+
+        self.connect_kwargs = dict(connect_kwargs)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_age = max_age
+        self.health_check_interval = health_check_interval
+
+        self._cond = threading.Condition()
+        self._idle = deque()      # (conn, created_at, returned_at)
+        self._created_at = {}     # id(conn) -> created_at, for checked-out connections
+        self._size = 0            # open connections (idle + in use + being opened)
+        self._in_use = 0
+        self._prefilled = False
+        self._closed = False
+
+        # Counters for sizing the pool
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+        self._opened = 0
+        self._discarded = 0
+
+    def _connect(self):
+        conn = MySQLdb.connect(**self.connect_kwargs)
+        with self._cond:
+            self._opened += 1
+        return conn, time.monotonic()
+
+    def _usable(self, conn, created_at, returned_at):
+        # Retire old connections and ping ones that have been idle for a while
+        now = time.monotonic()
+        if self.max_age and now - created_at > self.max_age:
+            return False
+        if now - returned_at >= self.health_check_interval:
+            try:
+                conn.ping()
+            except MySQLdb.Error:
+                return False
+        return True
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except MySQLdb.Error:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._discarded += 1
+            self._cond.notify()
+
+    def _prefill(self):
+        # Open min_size connections once, best effort
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn, created_at = self._connect()
+            except MySQLdb.Error:
+                with self._cond:
+                    self._size -= 1
+                return
+            with self._cond:
+                self._idle.append((conn, created_at, created_at))
+                self._cond.notify()
+
+    def acquire(self, blocking=True):
+        # Borrow a connection, waiting up to `timeout` seconds for one to be free.
+        # With blocking=False, return None at once instead of waiting.
+        start = time.monotonic()
+        waited = False
+
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise MySQLdb.OperationalError("Connection pool is closed.")
+
+                while not self._idle and self._size >= self.max_size:
+                    if not blocking:
+                        return None
+                    remaining = self.timeout - (time.monotonic() - start)
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        self._wait_time += time.monotonic() - start
+                        raise PoolTimeout(
+                            f"No database connection available within {self.timeout}s "
+                            f"(max_size={self.max_size}).")
+                    if not waited:
+                        waited = True
+                        self._waits += 1
+                    self._cond.wait(remaining)
+
+                if self._idle:
+                    # LIFO keeps the warmest connections in use
+                    conn, created_at, returned_at = self._idle.pop()
+                else:
+                    conn = None
+                    self._size += 1
+
+            if conn is None:
+                try:
+                    conn, created_at = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._usable(conn, created_at, returned_at):
+                self._discard(conn)
+                continue
+
+            with self._cond:
+                self._in_use += 1
+                self._created_at[id(conn)] = created_at
+                if waited:
+                    self._wait_time += time.monotonic() - start
+
+            if not self._prefilled:
+                self._prefilled = True
+                self._prefill()
+            return conn
+
+    def release(self, conn, discard=False):
+        # Return a connection, resetting session state so the next borrower starts clean
+        with self._cond:
+            created_at = self._created_at.pop(id(conn), time.monotonic())
+            self._in_use -= 1
+
+        if not discard and not self._closed:
+            try:
+                conn.rollback()
+                autocommit = self.connect_kwargs.get("autocommit", False)
+                if conn.get_autocommit() != autocommit:
+                    conn.autocommit(autocommit)
+            except MySQLdb.Error:
+                discard = True
+
+        if discard or self._closed or (self.max_age and time.monotonic() - created_at > self.max_age):
+            self._discard(conn)
+            return
+
+        with self._cond:
+            self._idle.append((conn, created_at, time.monotonic()))
+            self._cond.notify()
+
+    def stats(self):
+        # Snapshot of pool usage
+        with self._cond:
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waits": self._waits,
+                "wait_time_total": round(self._wait_time, 6),
+                "timeouts": self._timeouts,
+                "opened": self._opened,
+                "discarded": self._discarded,
+            }
+
+    def close(self):
+        # Close idle connections; checked-out ones are closed when released
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for conn, _created_at, _returned_at in idle:
+            self._discard(conn)
+
+
+class Replica:
+    """
+    A read replica: its connection pool plus the last measured replication lag.
+    Lag is re-measured at most every `check_interval` seconds on a borrowed
+    connection; a replica more than `max_lag` seconds behind (or with
+    replication stopped, or unreachable) is skipped until the next check.
+    """
+
+    def __init__(self, name, pool, max_lag=5.0, check_interval=2.0):
+        self.name = name
+        self.pool = pool
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag = None
+        self.healthy = True
+        self.checked_at = float("-inf")
+        self.reads = 0
+        self.skipped = 0
+
+    def _check_due(self):
+        return time.monotonic() - self.checked_at >= self.check_interval
+
+    def _mark(self, lag):
+        self.lag = lag
+        self.healthy = lag is not None and lag <= self.max_lag
+        self.checked_at = time.monotonic()
+
+    def acquire(self):
+        # A connection if this replica is usable right now, else None
+        if not self.healthy and not self._check_due():
+            self.skipped += 1
+            return None
+        try:
+            # Never wait for a busy replica: the primary (or the next replica) serves the read
+            conn = self.pool.acquire(blocking=False)
+        except MySQLdb.Error:
+            self._mark(None)
+            self.skipped += 1
+            return None
+        if conn is None:
+            # Busy, not broken
+            self.skipped += 1
+            return None
+
+        if self._check_due():
+            try:
+                self._mark(replication_lag(conn))
+            except MySQLdb.Error:
+                self._mark(None)
+                self.pool.release(conn, discard=True)
+                self.skipped += 1
+                return None
+
+        if not self.healthy:
+            self.pool.release(conn)
+            self.skipped += 1
+            return None
+        self.reads += 1
+        return conn
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "lag": self.lag,
+            "reads": self.reads,
+            "skipped": self.skipped,
+            "pool": self.pool.stats(),
+        }
+
+
+def replication_lag(conn):
+    """
+    Seconds this server is behind its source: 0 if it is not a replica
+    (e.g. a stand-in copy), None if replication is stopped.
+    """
+    cur = conn.cursor(cursorclass=MySQLdb.cursors.DictCursor)
+    try:
+        try:
+            cur.execute("SHOW REPLICA STATUS;")
+        except MySQLdb.Error:
+            # MySQL before 8.0.22
+            cur.execute("SHOW SLAVE STATUS;")
+        row = cur.fetchone()
+    finally:
+        cur.close()
+    if not row:
+        return 0
+    lag = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+    return None if lag is None else int(lag)
+
 
 def init_db(
     app: Flask,
@@ -15,32 +463,301 @@ def init_db(
     database: str,
     port: int = 3306,
     autocommit: bool = True,
+    pool_min_size: int = 1,
+    pool_max_size: int = 10,
+    pool_timeout: float = 5.0,
+    pool_max_age: float = 3600,
+    pool_health_check_interval: float = 30,
+    replicas: list = None,
+    replica_max_lag: float = 5.0,
+    replica_lag_check_interval: float = 2.0,
+    replica_connect_timeout: int = 2,
+    read_your_writes: float = 5.0,
 ):
-    # Initialize database connection for Flask app
+    # Initialize database connection pool for Flask app.
+    # replicas: list of dicts overriding host / port / user / password / database
+    # of the primary settings, one per read replica (see replica_reads).
+    # Replicas connect with a short timeout, so an unreachable one costs
+    # replica_connect_timeout seconds before the primary is used, not the OS TCP timeout.
+    global _pool, _executor, _replicas, read_your_writes_seconds
+
     connection_params["user"] = user
     connection_params["password"] = password
     connection_params["host"] = host
     connection_params["database"] = database
     connection_params["port"] = port
     connection_params["autocommit"] = autocommit
+    # Plain conn.cursor() calls are instrumented too
+    connection_params["cursorclass"] = Cursor
+
+    if _pool is not None:
+        _pool.close()
+    _pool = ConnectionPool(
+        connection_params,
+        min_size=pool_min_size,
+        max_size=pool_max_size,
+        timeout=pool_timeout,
+        max_age=pool_max_age,
+        health_check_interval=pool_health_check_interval,
+    )
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=pool_max_size, thread_name_prefix="db-gather")
+
+    for replica in _replicas:
+        replica.pool.close()
+    _replicas = []
+    for settings in replicas or []:
+        params = dict(connection_params, connect_timeout=replica_connect_timeout)
+        params.update(settings)
+        pool = ConnectionPool(
+            params,
+            min_size=0,
+            max_size=pool_max_size,
+            timeout=pool_timeout,
+            max_age=pool_max_age,
+            health_check_interval=pool_health_check_interval,
+        )
+        _replicas.append(Replica(f"{params['host']}:{params['port']}", pool,
+                                 max_lag=replica_max_lag, check_interval=replica_lag_check_interval))
+    read_your_writes_seconds = read_your_writes
+
+    # Register the hooks once per app (init_db may be called again to re-point it)
+    hooks = app.extensions.setdefault("sds_db", set())
+    if "close_db" not in hooks:
+        app.teardown_appcontext(close_db)
+        hooks.add("close_db")
+    if _replicas and "pin_to_primary" not in hooks:
+        app.after_request(_pin_to_primary)
+        hooks.add("pin_to_primary")
+
+
+def _pinned_to_primary():
+    # Read-your-writes: this browser wrote recently, so replicas may not have it yet
+    return session.get("_primary_until", 0) > time.time()
+
+
+def _pin_to_primary(response):
+    if _replicas and request.method not in SAFE_METHODS:
+        session["_primary_until"] = time.time() + read_your_writes_seconds
+    return response
+
 
-    app.teardown_appcontext(close_db)
+def _checkout():
+    # (connection, pool) for this request: a fresh-enough replica in
+    # replica_reads views, otherwise the primary
+    global _replica_turn, _replica_fallbacks
+    if (_replicas and g.get("replica_reads") and request.method in SAFE_METHODS
+            and not _pinned_to_primary()):
+        _replica_turn += 1
+        for i in range(len(_replicas)):
+            replica = _replicas[(_replica_turn + i) % len(_replicas)]
+            conn = replica.acquire()
+            if conn is not None:
+                g.db_server = replica.name
+                return conn, replica.pool
+        _replica_fallbacks += 1
+    g.db_server = "primary"
+    return _pool.acquire(), _pool
 
 
 def get_db():
-    # Get MySQL database connection for current request
+    # Get MySQL database connection for current request (borrowed from the pool;
+    # from a read replica in replica_reads views when one is available)
     if "db" not in g:
-        g.db = MySQLdb.connect(**connection_params)
+        g.db, g.db_pool = _checkout()
     return g.db
 
 
-def get_cursor():
-    # Get a new MySQL dictionary cursor for current request
-    return get_db().cursor(cursorclass=MySQLdb.cursors.DictCursor)
+def replica_reads(view):
+    """
+    Decorator for read-only pages: their queries may go to a read replica
+    (round robin among replicas within the lag limit). Falls back to the
+    primary when no replica is fresh enough, and for browsers that wrote
+    in the last few seconds, so they see their own changes.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        g.replica_reads = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def get_cursor(unbuffered=False):
+    # Get a new MySQL dictionary cursor for current request.
+    # unbuffered=True returns a server-side SSDictCursor that streams rows as
+    # they are iterated instead of loading the whole result; read it to the end
+    # (or close it) before running another query on the same connection.
+    # Both are instrumented (timings / query counts, see _record)
+    cursorclass = SSDictCursor if unbuffered else DictCursor
+    return get_db().cursor(cursorclass=cursorclass)
+
+
+def iter_rows(cursor):
+    # Yield rows from a (server-side) cursor, closing it when done or abandoned
+    try:
+        for row in cursor:
+            yield row
+    finally:
+        cursor.close()
+
+
+@contextmanager
+def transaction():
+    """
+    Unit of work on the request's connection.
+
+    The outermost block runs START TRANSACTION and commits once on success or
+    rolls back if an exception escapes. Nested blocks become savepoints, so an
+    inner failure can be rolled back without losing the outer work.
+    """
+    conn = get_db()
+    depth = g.get("tx_depth", 0)
+    savepoint_name = f"sp_{depth}"
+
+    cur = conn.cursor()
+    if depth == 0:
+        g.pop("tx_deferred", None)
+        cur.execute("START TRANSACTION;")
+    else:
+        cur.execute(f"SAVEPOINT {savepoint_name};")
+    g.tx_depth = depth + 1
+
+    try:
+        yield conn
+        if depth == 0:
+            # Deferred statements run last, so their row locks are held only until the commit
+            for fn, items in g.pop("tx_deferred", {}).values():
+                fn(cur, items)
+    except BaseException:
+        if depth == 0:
+            g.pop("tx_deferred", None)
+            conn.rollback()
+        else:
+            cur.execute(f"ROLLBACK TO SAVEPOINT {savepoint_name};")
+        raise
+    else:
+        if depth == 0:
+            conn.commit()
+        else:
+            cur.execute(f"RELEASE SAVEPOINT {savepoint_name};")
+    finally:
+        g.tx_depth = depth
+        cur.close()
+
+
+def defer_until_commit(name, fn, items):
+    """
+    Inside transaction(): collect `items` under `name` and call fn(cursor, items)
+    once, as the last statement(s) before the outermost commit (dropped on rollback).
+    Returns False, doing nothing, when no transaction is open.
+    """
+    if not g.get("tx_depth", 0):
+        return False
+    deferred = g.setdefault("tx_deferred", {})
+    if name not in deferred:
+        deferred[name] = (fn, set())
+    deferred[name][1].update(items)
+    return True
+
+
+@contextmanager
+def savepoint():
+    """Savepoint inside the current transaction (rolled back alone on exception)."""
+    if not g.get("tx_depth", 0):
+        raise RuntimeError("db.savepoint() must be used inside db.transaction().")
+    with transaction() as conn:
+        yield conn
+
+
+def transactional(view):
+    """
+    Decorator for write routes: everything the view writes on a POST (or other
+    non-GET request) is committed once at the end, or rolled back on error.
+    GET requests run as before without an explicit transaction.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return view(*args, **kwargs)
+        with transaction():
+            return view(*args, **kwargs)
+    return wrapper
+
+
+def _run_query(conn, sql, params, fetch):
+    # Run one gather() query; returns (result, seconds, rowcount)
+    cur = conn.cursor(cursorclass=MySQLdb.cursors.DictCursor)
+    try:
+        start = time.perf_counter()
+        cur.execute(sql, params)
+        result = cur.fetchone() if fetch == "one" else cur.fetchall()
+        return result, time.perf_counter() - start, cur.rowcount
+    finally:
+        cur.close()
+
+
+def _run_pooled(pool, conn, sql, params, fetch):
+    # gather() worker: run on a borrowed connection and give it back
+    try:
+        return _run_query(conn, sql, params, fetch)
+    finally:
+        pool.release(conn)
+
+
+def gather(*queries):
+    """
+    Run independent read queries at the same time and return their results
+    in order. Each query is (sql, params) for fetchall() rows, or
+    (sql, params, "one") for fetchone().
+
+    The first query runs on the request's connection; the others run on
+    extra pooled connections in worker threads, so the page waits about as
+    long as its slowest query. Queries that find no free connection (and
+    all queries inside a transaction, which other connections can't see)
+    run one after another on the request's connection instead.
+    """
+    queries = [(q[0], q[1], q[2] if len(q) > 2 else "all") for q in queries]
+    outcomes = [None] * len(queries)
+
+    # Extra connections come from the same server (primary or replica) as the request's
+    conn = get_db()
+    pool = g.db_pool
+
+    futures = {}
+    if not g.get("tx_depth"):
+        for i, (sql, params, fetch) in enumerate(queries[1:], 1):
+            extra = pool.acquire(blocking=False)
+            if extra is None:
+                break
+            futures[i] = _executor.submit(_run_pooled, pool, extra, sql, params, fetch)
+
+    for i, (sql, params, fetch) in enumerate(queries):
+        if i not in futures:
+            outcomes[i] = _run_query(conn, sql, params, fetch)
+    for i, future in futures.items():
+        outcomes[i] = future.result()
+
+    # Worker threads have no request context, so count the queries here
+    for (sql, params, _fetch), (_result, elapsed, rows) in zip(queries, outcomes):
+        _record(sql, params, elapsed, rows)
+    return [result for result, _elapsed, _rows in outcomes]
+
+
+def pool_stats():
+    # Current pool statistics (in use, idle, waits, wait time, ...), plus
+    # per-replica lag / health when read replicas are configured
+    if _pool is None:
+        return {}
+    stats = _pool.stats()
+    if _replicas:
+        stats["replicas"] = [replica.stats() for replica in _replicas]
+        stats["replica_fallbacks"] = _replica_fallbacks
+    return stats
 
 
 def close_db(exception=None):
-    # Close database connection at end of request
+    # Return database connection to the pool at end of request
     db = g.pop("db", None)
+    pool = g.pop("db_pool", _pool)
     if db is not None:
-        db.close()
+        pool.release(db)
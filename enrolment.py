@@ -0,0 +1,106 @@
+"""
+Set-based bulk enrolment of students into classes.
+
+Eligibility follows the same rule as the single-student enrolment page: the
+class must be for a dance type the student has a grade in, at the student's
+current (highest) grade level for that dance type or one level above.
+"""
+
+import counters
+import versions
+
+ENROLLED = "enrolled"
+DUPLICATE = "duplicate"
+INELIGIBLE = "ineligible"
+
+
+def _in_list(values):
+    return ", ".join(["%s"] * len(values))
+
+
+def eligible_pairs(cur, student_ids, class_ids):
+    """(student_id, class_id) pairs among the given ids that pass the grade-level rule."""
+    cur.execute(f"""
+        SELECT sgl.student_id, c.class_id
+        FROM classes c
+        JOIN grades g ON c.grade_id = g.grade_id
+
+        -- Each student's current grade per dance type (highest grade_level)
+        JOIN (
+            SELECT
+                sg.student_id,
+                sg.dancetype_id,
+                MAX(gr2.grade_level) AS cur_level
+            FROM studentgrades sg
+            JOIN grades gr2 ON sg.grade_id = gr2.grade_id
+            WHERE sg.student_id IN ({_in_list(student_ids)})
+            GROUP BY sg.student_id, sg.dancetype_id
+        ) sgl
+          ON sgl.dancetype_id = c.dancetype_id
+
+        WHERE c.class_id IN ({_in_list(class_ids)})
+          AND g.grade_level BETWEEN sgl.cur_level AND (sgl.cur_level + 1);
+    """, list(student_ids) + list(class_ids))
+    return {(r["student_id"], r["class_id"]) for r in cur.fetchall()}
+
+
+def existing_pairs(cur, student_ids, class_ids):
+    """(student_id, class_id) pairs among the given ids that are already enrolled."""
+    cur.execute(f"""
+        SELECT student_id, class_id
+        FROM studentclasses
+        WHERE student_id IN ({_in_list(student_ids)})
+          AND class_id IN ({_in_list(class_ids)});
+    """, list(student_ids) + list(class_ids))
+    return {(r["student_id"], r["class_id"]) for r in cur.fetchall()}
+
+
+def bulk_enrol(cur, pairs):
+    """
+    Enrol many (student_id, class_id) pairs with a constant number of queries.
+    Run inside a transaction. Returns {(student_id, class_id): status} with
+    status ENROLLED, DUPLICATE or INELIGIBLE.
+    """
+    pairs = list(dict.fromkeys((int(sid), int(cid)) for sid, cid in pairs))
+    if not pairs:
+        return {}
+
+    student_ids = sorted({sid for sid, _cid in pairs})
+    class_ids = sorted({cid for _sid, cid in pairs})
+
+    # The first read fixes the transaction snapshot used by existing_pairs() below
+    eligible = eligible_pairs(cur, student_ids, class_ids)
+    before = existing_pairs(cur, student_ids, class_ids)
+
+    results = dict.fromkeys(pairs)   # keeps the request order
+    to_insert = []
+    for pair in pairs:
+        if pair in before:
+            results[pair] = DUPLICATE
+        elif pair not in eligible:
+            results[pair] = INELIGIBLE
+        else:
+            to_insert.append(pair)
+
+    if to_insert:
+        # executemany sends one multi-row INSERT IGNORE
+        cur.executemany("""
+            INSERT IGNORE INTO studentclasses (student_id, class_id)
+            VALUES (%s, %s);
+        """, to_insert)
+
+        inserted = to_insert
+        if cur.rowcount != len(to_insert):
+            # Some pairs were enrolled concurrently. Our snapshot still hides those,
+            # so anything visible now that wasn't before is a row we inserted.
+            inserted = sorted(existing_pairs(cur, student_ids, class_ids) - before)
+
+        inserted_set = set(inserted)
+        for pair in to_insert:
+            results[pair] = ENROLLED if pair in inserted_set else DUPLICATE
+
+        counters.record_enrolments(cur, inserted)
+        if inserted:
+            versions.bump(cur, "studentclasses")
+
+    return results
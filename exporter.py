@@ -0,0 +1,119 @@
+"""
+Streaming CSV / NDJSON export of students, classes, enrolments and the
+teacher report.
+
+Rows are read with an unbuffered server-side cursor and written out as they
+arrive, so exporting millions of rows uses constant memory and the first
+bytes are sent immediately.
+"""
+
+import csv
+import datetime
+import decimal
+import io
+import json
+import sys
+
+import click
+
+import counters
+import db
+
+DATASETS = {
+    "students": """
+        SELECT student_id, first_name, last_name, email, phone,
+               date_of_birth, enrollment_date, is_active
+        FROM students
+        ORDER BY student_id;
+    """,
+    "classes": """
+        SELECT c.class_id, c.class_name, dt.dancetype_name, g.grade_name,
+               c.teacher_id, c.schedule_day, c.schedule_time
+        FROM classes c
+        JOIN dancetype dt ON c.dancetype_id = dt.dancetype_id
+        LEFT JOIN grades g ON c.grade_id = g.grade_id
+        ORDER BY c.class_id;
+    """,
+    "enrolments": """
+        SELECT studentclass_id, student_id, class_id
+        FROM studentclasses
+        ORDER BY studentclass_id;
+    """,
+    "teacher-report": counters.REPORT_QUERY,
+}
+
+FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+# Rows written per chunk handed to the response / file
+ROWS_PER_CHUNK = 500
+
+
+def _plain(value):
+    # Convert MySQL values (dates, TIME as timedelta, DECIMAL) to JSON / CSV friendly ones
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        seconds = int(value.total_seconds())
+        return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    if isinstance(value, decimal.Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return value
+
+
+def _csv_chunks(rows, columns):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    for count, row in enumerate(rows, 1):
+        writer.writerow([_plain(row[c]) for c in columns])
+        if count % ROWS_PER_CHUNK == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def _ndjson_chunks(rows):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({k: _plain(v) for k, v in row.items()}, separators=(",", ":")))
+        if len(lines) == ROWS_PER_CHUNK:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def iter_export(dataset, fmt):
+    """Yield the export of `dataset` in `fmt` ("csv" or "ndjson") as text chunks."""
+    cursor = db.get_cursor(unbuffered=True)
+    cursor.execute(DATASETS[dataset])
+    columns = [d[0] for d in cursor.description]
+    rows = db.iter_rows(cursor)
+
+    if fmt == "csv":
+        yield from _csv_chunks(rows, columns)
+    else:
+        yield from _ndjson_chunks(rows)
+
+
+def init_app(app):
+    """Register the `flask export` command."""
+
+    @app.cli.command("export")
+    @click.argument("dataset", type=click.Choice(sorted(DATASETS)))
+    @click.option("--format", "fmt", type=click.Choice(sorted(FORMATS)), default="csv", show_default=True)
+    @click.option("--output", "-o", type=click.Path(dir_okay=False, writable=True),
+                  help="File to write (default: standard output).")
+    def export_command(dataset, fmt, output):
+        """Export DATASET as CSV or NDJSON."""
+        out = open(output, "w", encoding="utf-8", newline="") if output else sys.stdout
+        try:
+            for chunk in iter_export(dataset, fmt):
+                out.write(chunk)
+        finally:
+            if output:
+                out.close()
@@ -0,0 +1,180 @@
+"""
+Streaming CSV import of students.
+
+The CSV needs a header row. Student columns use the form field names:
+
+    first_name, last_name, email, phone, date_of_birth (YYYY-MM-DD), enrollment_date
+
+Any column named after a dance type (e.g. "Ballet", case-insensitive) sets
+the student's grade for it, given as a grade name ("Grade 2") or grade_id.
+
+Rows are validated with the same rules as the Add Student form. Valid rows
+are inserted in batches with one transaction per batch (an INSERT per
+student for its id, then one multi-row INSERT each for the grades and
+search tokens), so memory use is bounded by the batch size, not the file size.
+"""
+
+import codecs
+import csv
+
+import click
+
+import db
+import refdata
+import search
+import versions
+from validation import STUDENT_FORM, flat_errors
+
+# Row errors kept for the report; later errors are only counted
+MAX_REPORTED_ERRORS = 1000
+
+
+def _grade_columns(fieldnames):
+    # CSV column -> dancetype_id for columns named after a dance type
+    by_name = {dt["dancetype_name"].strip().lower(): dt["dancetype_id"] for dt in refdata.get_dancetypes()}
+    return {name: by_name[name.strip().lower()] for name in fieldnames if name and name.strip().lower() in by_name}
+
+
+def _grade_lookup():
+    # Grade name (lower case) or id (as text) -> grade_id
+    lookup = {}
+    for grade in refdata.get_grades():
+        lookup[grade["grade_name"].strip().lower()] = grade["grade_id"]
+        lookup[str(grade["grade_id"])] = grade["grade_id"]
+    return lookup
+
+
+def _insert_batch(batch):
+    """Insert one batch of (clean, grades) rows in a single transaction."""
+    cur = db.get_cursor()
+    with db.transaction():
+        # One INSERT per student so each id comes from its own lastrowid:
+        # executemany() may split a batch into several statements, and InnoDB
+        # does not promise consecutive ids (innodb_autoinc_lock_mode=2,
+        # auto_increment_increment > 1), so ids can't be derived from the first.
+        grade_rows = []
+        token_rows = []
+        for clean, grades in batch:
+            cur.execute("""
+                INSERT INTO students (first_name, last_name, email, phone, date_of_birth, enrollment_date)
+                VALUES (%s, %s, %s, %s, %s, %s);
+            """, (clean["first_name"], clean["last_name"], clean["email"], clean["phone"],
+                  clean["date_of_birth"], clean["enrollment_date"]))
+            sid = cur.lastrowid
+            grade_rows.extend((sid, dtid, gid) for dtid, gid in sorted(grades.items()))
+            token_rows.extend(search.index_rows(sid, clean["first_name"], clean["last_name"], clean["email"]))
+
+        if grade_rows:
+            cur.executemany("""
+                INSERT INTO studentgrades (student_id, dancetype_id, grade_id)
+                VALUES (%s, %s, %s);
+            """, grade_rows)
+        if token_rows:
+            cur.executemany("""
+                INSERT INTO studentsearch (token, student_id, field)
+                VALUES (%s, %s, %s);
+            """, token_rows)
+
+        versions.bump(cur, "students", "studentgrades", "studentsearch")
+    cur.close()
+
+
+def import_students(stream, batch_size=1000):
+    """
+    Import students from an iterable of CSV lines (see text_stream).
+    Returns a report dict: rows, imported, error_count, errors
+    (a list of (line_number, [messages]) for the first MAX_REPORTED_ERRORS bad rows)
+    and stopped: (line_number, message) when the file itself could not be read
+    past that line (not UTF-8, malformed CSV), else None. Valid rows before
+    that line are still imported.
+    """
+    reader = csv.DictReader(stream)
+    report = {"rows": 0, "imported": 0, "error_count": 0, "errors": [], "stopped": None}
+    batch = []
+    try:
+        if not reader.fieldnames:
+            report["error_count"] = 1
+            report["errors"].append((1, ["The file is empty or has no header row."]))
+            return report
+
+        grade_columns = _grade_columns(reader.fieldnames)
+        grade_ids = _grade_lookup()
+
+        for row, clean, field_errors in STUDENT_FORM.validate_many(reader):
+            report["rows"] += 1
+            errors = flat_errors(field_errors)
+
+            grades = {}
+            for column, dtid in grade_columns.items():
+                raw = (row.get(column) or "").strip()
+                if not raw:
+                    continue
+                gid = grade_ids.get(raw.lower())
+                if gid is None:
+                    errors.append(f"Unknown grade '{raw}' for {column}.")
+                else:
+                    grades[dtid] = gid
+
+            if errors:
+                report["error_count"] += 1
+                if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                    report["errors"].append((reader.line_num, errors))
+                continue
+
+            batch.append((clean, grades))
+            if len(batch) >= batch_size:
+                _insert_batch(batch)
+                report["imported"] += len(batch)
+                batch = []
+    # Both fail on the line after the last one the reader counted
+    except UnicodeDecodeError:
+        report["stopped"] = (reader.line_num + 1, "The file is not UTF-8 text (save it as \"CSV UTF-8\").")
+    except csv.Error as e:
+        report["stopped"] = (reader.line_num + 1, f"The file is not valid CSV: {e}.")
+
+    if batch:
+        _insert_batch(batch)
+        report["imported"] += len(batch)
+
+    return report
+
+
+def stopped_message(report):
+    """Message for an import that stopped at an unreadable line, or None."""
+    if not report["stopped"]:
+        return None
+    line, problem = report["stopped"]
+    return (f"Import stopped at line {line}: {problem} "
+            f"{report['imported']} students before that line were imported; fix the file "
+            f"and import the remaining rows.")
+
+
+def text_stream(binary):
+    """
+    Lines of an uploaded (binary) file as text for csv, accepting UTF-8 with
+    or without BOM. Lines are decoded one at a time, so a UnicodeDecodeError
+    points at the line it came from.
+    """
+    for number, line in enumerate(binary, 1):
+        if number == 1 and line.startswith(codecs.BOM_UTF8):
+            line = line[len(codecs.BOM_UTF8):]
+        yield line.decode("utf-8")
+
+
+def init_app(app):
+    """Register the `flask import-students` command."""
+
+    @app.cli.command("import-students")
+    @click.argument("csv_file", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--batch-size", default=1000, show_default=True, help="Rows per INSERT / transaction.")
+    def import_students_command(csv_file, batch_size):
+        """Import students (and their grades) from CSV_FILE."""
+        with open(csv_file, "rb") as f:
+            report = import_students(text_stream(f), batch_size=batch_size)
+
+        for line, errors in report["errors"]:
+            click.echo(f"line {line}: {' '.join(errors)}")
+        click.echo(f"{report['imported']} of {report['rows']} rows imported, "
+                   f"{report['error_count']} rows with errors.")
+        if report["stopped"]:
+            raise click.ClickException(stopped_message(report))
@@ -0,0 +1,248 @@
+"""
+Versioned schema migrations.
+
+Each file in migrations/ is named NNNN_description.sql and has an
+"-- migrate:up" section and a "-- migrate:down" section. Applied versions
+are recorded in the schema_version table. sds_local.sql / sds_pa.sql
+already contain every migration and record them, so a fresh database
+starts up to date; older databases are brought forward with:
+
+    flask --app app schema up          # apply pending migrations
+    flask --app app schema down        # revert the latest one
+    flask --app app schema status
+    flask --app app schema check-indexes
+
+MySQL commits DDL immediately, so a migration that fails part way is not
+rolled back; fix the schema by hand and re-run. A named lock stops two
+runners from migrating the same database at once.
+"""
+
+import os
+import re
+
+import click
+
+import db
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+_FILENAME = re.compile(r"^(\d+)_(\w+)\.sql$")
+_SECTION = re.compile(r"^--\s*migrate:(up|down)\s*$", re.MULTILINE)
+
+# Hot queries and the index each table access should use:
+# (name, sql, params, {table alias in EXPLAIN: (acceptable index names)})
+HOT_QUERIES = [
+    ("student list page", """
+        SELECT student_id, first_name, last_name
+        FROM students s
+        ORDER BY s.last_name, s.first_name, s.student_id
+        LIMIT 51;
+    """, (), {"s": ("idx_students_name",)}),
+
+    ("teacher list page", """
+        SELECT teacher_id, first_name, last_name
+        FROM teachers
+        ORDER BY last_name, first_name, teacher_id
+        LIMIT 51;
+    """, (), {"teachers": ("idx_teachers_name",)}),
+
+    ("student search", """
+        SELECT student_id
+        FROM studentsearch
+        WHERE token LIKE %s;
+    """, ("smi%",), {"studentsearch": ("PRIMARY",)}),
+
+    ("student grades", """
+        SELECT dancetype_id, grade_id
+        FROM studentgrades
+        WHERE student_id = %s;
+    """, (1,), {"studentgrades": ("idx_studentgrades_student_dance", "unique_student_grade_dance")}),
+
+    ("enrolment eligibility", """
+        SELECT c.class_id
+        FROM classes c
+        JOIN grades g ON c.grade_id = g.grade_id
+        JOIN (
+            SELECT sg.dancetype_id, MAX(gr2.grade_level) AS cur_level
+            FROM studentgrades sg
+            JOIN grades gr2 ON sg.grade_id = gr2.grade_id
+            WHERE sg.student_id = %s
+            GROUP BY sg.dancetype_id
+        ) sgl ON sgl.dancetype_id = c.dancetype_id
+        LEFT JOIN studentclasses sc ON sc.student_id = %s AND sc.class_id = c.class_id
+        WHERE sc.class_id IS NULL
+          AND g.grade_level BETWEEN sgl.cur_level AND (sgl.cur_level + 1);
+    """, (1, 1), {
+        "c": ("idx_classes_dance_grade",),
+        "sg": ("idx_studentgrades_student_dance",),
+        "sc": ("unique_student_class",),
+    }),
+]
+
+
+def sql_statements(text):
+    """Statements of an SQL script, with -- comments removed."""
+    text = re.sub(r"--[^\n]*", "", text)
+    return [stmt.strip() for stmt in text.split(";") if stmt.strip()]
+
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    """
+    All migrations in version order, as dicts with version, name,
+    description (the file's first comment line), up and down statements.
+    """
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = _FILENAME.match(filename)
+        if not match:
+            continue
+        with open(os.path.join(directory, filename), encoding="utf-8") as f:
+            text = f.read()
+
+        parts = _SECTION.split(text)
+        sections = dict(zip(parts[1::2], parts[2::2]))
+        if set(sections) != {"up", "down"}:
+            raise click.ClickException(f"{filename}: needs one '-- migrate:up' and one '-- migrate:down' section.")
+
+        header = parts[0].strip().splitlines()
+        migrations.append({
+            "version": int(match.group(1)),
+            "name": match.group(2),
+            "description": header[0].lstrip("- ").strip() if header else "",
+            "up": sql_statements(sections["up"]),
+            "down": sql_statements(sections["down"]),
+        })
+
+    versions = [m["version"] for m in migrations]
+    if len(set(versions)) != len(versions):
+        raise click.ClickException("Two migration files share a version number.")
+    return migrations
+
+
+def applied_versions(cur):
+    """Versions recorded in schema_version (the table is created if missing)."""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    cur.execute("SELECT version FROM schema_version ORDER BY version;")
+    return [r["version"] for r in cur.fetchall()]
+
+
+def _run(conn, cur, migration, direction):
+    for stmt in migration[direction]:
+        cur.execute(stmt)
+    if direction == "up":
+        cur.execute("INSERT INTO schema_version (version, name) VALUES (%s, %s);",
+                    (migration["version"], migration["name"]))
+    else:
+        cur.execute("DELETE FROM schema_version WHERE version = %s;", (migration["version"],))
+    conn.commit()
+
+
+def upgrade(conn, cur, target=None):
+    """Apply pending migrations up to `target` (default: all). Returns those applied."""
+    done = set(applied_versions(cur))
+    pending = [m for m in load_migrations()
+               if m["version"] not in done and (target is None or m["version"] <= target)]
+    for migration in pending:
+        _run(conn, cur, migration, "up")
+    return pending
+
+
+def downgrade(conn, cur, target):
+    """Revert applied migrations above version `target`, newest first. Returns those reverted."""
+    done = set(applied_versions(cur))
+    reverting = [m for m in reversed(load_migrations()) if m["version"] in done and m["version"] > target]
+    for migration in reverting:
+        _run(conn, cur, migration, "down")
+    return reverting
+
+
+def check_indexes(cur):
+    """
+    EXPLAIN each hot query and compare the chosen index per table with the
+    expected ones. Returns (query, table, chosen key, rows, ok) tuples.
+    """
+    results = []
+    for name, sql, params, expected in HOT_QUERIES:
+        cur.execute("EXPLAIN " + sql.strip(), params)
+        plan = {r["table"]: r for r in cur.fetchall()}
+        for table, keys in expected.items():
+            row = plan.get(table)
+            key = row["key"] if row else None
+            results.append((name, table, key, row["rows"] if row else None, key in keys))
+    return results
+
+
+def init_app(app):
+    """Register the `flask schema` commands."""
+
+    @app.cli.group("schema")
+    def schema_group():
+        """Schema migrations (see migrations/)."""
+
+    def locked(fn):
+        # Run fn(conn, cur) holding the migration lock
+        conn = db.get_db()
+        cur = db.get_cursor()
+        cur.execute("SELECT GET_LOCK('sds_schema_migrate', 10) AS got;")
+        if not cur.fetchone()["got"]:
+            raise click.ClickException("Another migration is running.")
+        try:
+            return fn(conn, cur)
+        finally:
+            cur.execute("SELECT RELEASE_LOCK('sds_schema_migrate');")
+            cur.close()
+
+    @schema_group.command("up")
+    @click.option("--to", "target", type=int, help="Stop after this version.")
+    def up_command(target):
+        """Apply pending migrations."""
+        applied = locked(lambda conn, cur: upgrade(conn, cur, target))
+        for m in applied:
+            click.echo(f"applied {m['version']:04d} {m['name']}: {m['description']}")
+        click.echo(f"{len(applied)} migration(s) applied.")
+
+    @schema_group.command("down")
+    @click.option("--to", "target", type=int, help="Revert everything above this version.")
+    def down_command(target):
+        """Revert the latest migration (or back to --to)."""
+        def run(conn, cur):
+            done = applied_versions(cur)
+            if not done:
+                return []
+            return downgrade(conn, cur, target if target is not None else (done[-2] if len(done) > 1 else 0))
+
+        reverted = locked(run)
+        for m in reverted:
+            click.echo(f"reverted {m['version']:04d} {m['name']}")
+        click.echo(f"{len(reverted)} migration(s) reverted.")
+
+    @schema_group.command("status")
+    def status_command():
+        """List migrations and whether they are applied."""
+        cur = db.get_cursor()
+        done = set(applied_versions(cur))
+        cur.close()
+        for m in load_migrations():
+            mark = "applied" if m["version"] in done else "pending"
+            click.echo(f"{m['version']:04d} {m['name']:<24} {mark}")
+
+    @schema_group.command("check-indexes")
+    def check_indexes_command():
+        """EXPLAIN the hot queries and fail if one does not use its index."""
+        cur = db.get_cursor()
+        results = check_indexes(cur)
+        cur.close()
+
+        for name, table, key, rows, ok in results:
+            click.echo(f"{'ok  ' if ok else 'FAIL'} {name}: {table} -> {key or 'no index'} (rows {rows})")
+        failed = sum(1 for r in results if not r[-1])
+        if failed:
+            # Tiny tables may be scanned whatever the indexes; check on realistic data
+            raise click.ClickException(f"{failed} table access(es) not using the expected index.")
+        click.echo("All hot queries use their indexes.")
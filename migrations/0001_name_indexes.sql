@@ -0,0 +1,9 @@
+-- Name indexes for keyset pagination on the student and teacher lists
+
+-- migrate:up
+CREATE INDEX idx_students_name ON students (last_name, first_name, student_id);
+CREATE INDEX idx_teachers_name ON teachers (last_name, first_name, teacher_id);
+
+-- migrate:down
+DROP INDEX idx_teachers_name ON teachers;
+DROP INDEX idx_students_name ON students;
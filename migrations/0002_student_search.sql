@@ -0,0 +1,14 @@
+-- Student search token index (then run: flask --app app rebuild-search-index)
+
+-- migrate:up
+CREATE TABLE studentsearch (
+    token VARCHAR(100) NOT NULL,
+    student_id INT NOT NULL,
+    field TINYINT NOT NULL,          -- 1 = last name, 2 = first name, 3 = email
+    PRIMARY KEY (token, student_id, field),
+    KEY idx_studentsearch_student (student_id),
+    FOREIGN KEY (student_id) REFERENCES students(student_id) ON DELETE CASCADE
+);
+
+-- migrate:down
+DROP TABLE studentsearch;
@@ -0,0 +1,46 @@
+-- Enrolment counters for the teacher report, initialised from studentclasses
+
+-- migrate:up
+CREATE TABLE classenrolmentcounts (
+    class_id INT PRIMARY KEY,
+    student_count INT NOT NULL DEFAULT 0,
+    FOREIGN KEY (class_id) REFERENCES classes(class_id) ON DELETE CASCADE
+);
+
+CREATE TABLE teacherstudents (
+    teacher_id INT NOT NULL,
+    student_id INT NOT NULL,
+    enrolment_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (teacher_id, student_id),
+    FOREIGN KEY (teacher_id) REFERENCES teachers(teacher_id) ON DELETE CASCADE,
+    FOREIGN KEY (student_id) REFERENCES students(student_id) ON DELETE CASCADE
+);
+
+CREATE TABLE teacherstudentcounts (
+    teacher_id INT PRIMARY KEY,
+    student_count INT NOT NULL DEFAULT 0,
+    FOREIGN KEY (teacher_id) REFERENCES teachers(teacher_id) ON DELETE CASCADE
+);
+
+INSERT INTO classenrolmentcounts (class_id, student_count)
+SELECT c.class_id, COUNT(sc.student_id)
+FROM classes c
+LEFT JOIN studentclasses sc ON sc.class_id = c.class_id
+GROUP BY c.class_id;
+
+INSERT INTO teacherstudents (teacher_id, student_id, enrolment_count)
+SELECT c.teacher_id, sc.student_id, COUNT(*)
+FROM studentclasses sc
+JOIN classes c ON c.class_id = sc.class_id
+GROUP BY c.teacher_id, sc.student_id;
+
+INSERT INTO teacherstudentcounts (teacher_id, student_count)
+SELECT t.teacher_id, COUNT(ts.student_id)
+FROM teachers t
+LEFT JOIN teacherstudents ts ON ts.teacher_id = t.teacher_id
+GROUP BY t.teacher_id;
+
+-- migrate:down
+DROP TABLE teacherstudentcounts;
+DROP TABLE teacherstudents;
+DROP TABLE classenrolmentcounts;
@@ -0,0 +1,21 @@
+-- Per-table version counters for ETag / 304 and the report query cache
+
+-- migrate:up
+CREATE TABLE tableversions (
+    table_name VARCHAR(64) PRIMARY KEY,
+    version BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6)
+);
+
+INSERT INTO tableversions (table_name, version) VALUES
+('dancetype', 1),
+('grades', 1),
+('students', 1),
+('studentgrades', 1),
+('studentsearch', 1),
+('teachers', 1),
+('classes', 1),
+('studentclasses', 1);
+
+-- migrate:down
+DROP TABLE tableversions;
@@ -0,0 +1,25 @@
+-- Indexes for the enrolment eligibility join and per-student grade lookups
+
+-- migrate:up
+CREATE INDEX idx_classes_dance_grade ON classes (dancetype_id, grade_id);
+CREATE INDEX idx_studentgrades_student_dance ON studentgrades (student_id, dancetype_id, grade_id);
+
+-- Drop the single-column index an earlier down step left behind (the composite
+-- index now backs the foreign key), so up / down can be repeated
+SET @drop_sql = IF(
+    EXISTS (SELECT 1 FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = 'classes'
+              AND index_name = 'idx_classes_dancetype'),
+    'ALTER TABLE classes DROP INDEX idx_classes_dancetype',
+    'DO 0');
+PREPARE drop_stmt FROM @drop_sql;
+EXECUTE drop_stmt;
+DEALLOCATE PREPARE drop_stmt;
+
+-- migrate:down
+-- The composite index may now be the one backing the dancetype_id foreign key,
+-- so put a single-column index in place before dropping it
+ALTER TABLE classes
+    ADD INDEX idx_classes_dancetype (dancetype_id),
+    DROP INDEX idx_classes_dance_grade;
+DROP INDEX idx_studentgrades_student_dance ON studentgrades;
@@ -0,0 +1,119 @@
+"""Keyset (cursor-based) pagination helpers for list pages."""
+
+import base64
+import binascii
+import json
+import math
+
+
+def encode_cursor(values):
+    # Encode the sort-key values of a row as an opaque URL-safe token
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token, size):
+    # Decode a cursor token; returns None if it is missing or malformed
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    # Values become SQL parameters: only plain strings and (finite) numbers
+    for value in values:
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            return None
+        if isinstance(value, float) and not math.isfinite(value):
+            return None
+    return values
+
+
+def _split_column(column):
+    # "score DESC" -> ("score", True); "s.last_name" -> ("s.last_name", False)
+    if column.upper().endswith(" DESC"):
+        return column[:-5].strip(), True
+    return column, False
+
+
+def _keyset_condition(columns, backwards):
+    """
+    Build `(c1, c2, c3) > (%s, %s, %s)` expanded into nested OR/AND form,
+    which MySQL turns into a range scan on the matching composite index.
+    Columns marked DESC compare the other way. Returns the SQL string.
+    """
+    column, descending = _split_column(columns[0])
+    op = "<" if descending != backwards else ">"
+    if len(columns) == 1:
+        return f"{column} {op} %s"
+    inner = _keyset_condition(columns[1:], backwards)
+    return f"({column} {op} %s OR ({column} = %s AND {inner}))"
+
+
+def _keyset_params(values):
+    # Parameters for _keyset_condition, in placeholder order
+    if len(values) == 1:
+        return [values[0]]
+    return [values[0], values[0]] + _keyset_params(values[1:])
+
+
+def keyset_page(cursor, query, columns, key_fields, params=(), where=None,
+                after=None, before=None, page_size=50):
+    """
+    Fetch one page of `query` ordered by `columns` (must be unique together).
+
+    - query: SELECT ... FROM ... (no WHERE / ORDER BY / LIMIT)
+    - columns: SQL sort expressions, e.g. ["s.last_name", "s.first_name", "s.student_id"];
+      append " DESC" to sort a column in descending order
+    - key_fields: matching keys in each result row, e.g. ["last_name", "first_name", "student_id"]
+    - where: extra WHERE conditions (ANDed); their values come first in `params`
+    - after / before: decoded cursors from the previous page's links
+
+    Only page_size + 1 rows are read, so the cost does not depend on table size.
+    Returns a dict with rows, next_cursor and prev_cursor (None when no such page).
+    """
+    conditions = list(where or [])
+    args = list(params)
+
+    backwards = before is not None
+    anchor = before if backwards else after
+    if anchor is not None:
+        conditions.append(_keyset_condition(columns, backwards))
+        args.extend(_keyset_params(anchor))
+
+    order = []
+    for column in columns:
+        name, descending = _split_column(column)
+        order.append(f"{name} {'DESC' if descending != backwards else 'ASC'}")
+
+    full_query = query
+    if conditions:
+        full_query += " WHERE " + " AND ".join(f"({c})" for c in conditions)
+    full_query += " ORDER BY " + ", ".join(order)
+    full_query += " LIMIT %s;"
+    args.append(page_size + 1)
+
+    cursor.execute(full_query, args)
+    rows = list(cursor.fetchall())
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backwards:
+        rows.reverse()
+
+    def key_of(row):
+        return encode_cursor(row[f] for f in key_fields)
+
+    if backwards:
+        has_prev, has_next = has_more, True
+    else:
+        has_prev, has_next = anchor is not None, has_more
+
+    return {
+        "rows": rows,
+        "next_cursor": key_of(rows[-1]) if rows and has_next else None,
+        "prev_cursor": key_of(rows[0]) if rows and has_prev else None,
+    }
@@ -0,0 +1,121 @@
+"""
+In-process, single-flight cache for expensive report queries.
+
+Results are keyed by query text + parameters and stored together with the
+versions of the tables they were built from (versions.py). An entry is
+reused until its TTL runs out or any of those tables is written (a bump
+in any process changes the versions, so invalidation is driven by writes,
+not just by time).
+
+Concurrent misses for the same key are coalesced: one request runs the
+query while the others wait for its result instead of all hitting MySQL.
+Cached rows are shared between requests and must not be modified.
+"""
+
+import threading
+import time
+
+import versions
+
+# Seconds an entry may be reused (set from app config by init_app; 0 disables caching)
+ttl = 30
+
+# Most entries kept; the ones expiring soonest are dropped first
+max_entries = 256
+
+_lock = threading.Lock()
+_cache = {}      # key -> (expires_at, stamp, result)
+_inflight = {}   # key -> threading.Event set when the leader finishes
+
+_stats = {"hits": 0, "misses": 0, "coalesced": 0, "stale": 0}
+
+
+def _stamp(tables):
+    # Current versions of `tables`, in a fixed order
+    current = versions.current(tables)
+    return tuple(current.get(t, (0, None))[0] for t in tables)
+
+
+def _fresh(entry, stamp):
+    # Usable if not expired and built from these versions or newer ones
+    return (entry is not None and entry[0] > time.monotonic()
+            and all(have >= want for have, want in zip(entry[1], stamp)))
+
+
+def _store(key, stamp, result):
+    with _lock:
+        if len(_cache) >= max_entries and key not in _cache:
+            del _cache[min(_cache, key=lambda k: _cache[k][0])]
+        _cache[key] = (time.monotonic() + ttl, stamp, result)
+
+
+def cached(key, tables, load):
+    """
+    Return load() for `key`, reusing a cached result while `tables` are
+    unchanged and the TTL has not run out. Only one caller per key runs
+    load() at a time; the others wait for its result.
+    """
+    if ttl <= 0:
+        return load()
+
+    tables = tuple(sorted(tables))
+    stamp = _stamp(tables)
+
+    while True:
+        with _lock:
+            entry = _cache.get(key)
+            if _fresh(entry, stamp):
+                _stats["hits"] += 1
+                return entry[2]
+
+            event = _inflight.get(key)
+            leader = event is None
+            if leader:
+                event = _inflight[key] = threading.Event()
+                _stats["misses"] += 1
+                if entry is not None:
+                    _stats["stale"] += 1
+            else:
+                _stats["coalesced"] += 1
+
+        if not leader:
+            # Wait for the running query, then re-check (it may have failed
+            # or been built from older versions than ours)
+            event.wait()
+            continue
+
+        try:
+            result = load()
+            _store(key, stamp, result)
+            return result
+        finally:
+            with _lock:
+                del _inflight[key]
+            event.set()
+
+
+def fetchall(cursor, query, params=(), tables=()):
+    """cursor.fetchall() for `query`, cached on query + params while `tables` are unchanged."""
+    def load():
+        cursor.execute(query, params)
+        return tuple(cursor.fetchall())
+    return cached((query, tuple(params)), tables, load)
+
+
+def invalidate():
+    """Drop every cached result (e.g. after editing tables with SQL)."""
+    with _lock:
+        _cache.clear()
+
+
+def stats():
+    # Hit / miss / coalesced counts and current size
+    with _lock:
+        return dict(_stats, entries=len(_cache), inflight=len(_inflight), ttl=ttl)
+
+
+def init_app(app):
+    """Read QUERY_CACHE_TTL / QUERY_CACHE_MAX_ENTRIES from the app config."""
+    global ttl, max_entries
+    ttl = app.config["QUERY_CACHE_TTL"]
+    max_entries = app.config["QUERY_CACHE_MAX_ENTRIES"]
@@ -0,0 +1,107 @@
+"""
+In-process cache of reference data (grades and dance types).
+
+These tables almost never change, so the student forms read them from here
+instead of querying MySQL on every request. Entries expire after a TTL and
+can be dropped explicitly with invalidate() after editing the tables.
+"""
+
+import threading
+import time
+
+import MySQLdb
+
+import db
+
+QUERIES = {
+    "grades": """
+        SELECT grade_id, grade_name, grade_level
+        FROM grades
+        ORDER BY grade_level, grade_name;
+    """,
+    "dancetypes": """
+        SELECT dancetype_id, dancetype_name
+        FROM dancetype
+        ORDER BY dancetype_name;
+    """,
+}
+
+# Seconds before a cached table is re-read (set from app config by init_app)
+ttl = 300
+
+_lock = threading.Lock()
+_cache = {}   # name -> (expires_at, rows)
+
+# Incremented whenever a table is (re)loaded or dropped; part of the cache key
+# of template fragments built from reference data
+_generation = 0
+
+
+def _get(name):
+    # Return cached rows for `name`, reloading them if missing or expired
+    entry = _cache.get(name)
+    if entry is not None and entry[0] > time.monotonic():
+        return entry[1]
+
+    cur = db.get_cursor()
+    cur.execute(QUERIES[name])
+    rows = tuple(cur.fetchall())
+    cur.close()
+
+    global _generation
+    with _lock:
+        _cache[name] = (time.monotonic() + ttl, rows)
+        _generation += 1
+    return rows
+
+
+def get_grades():
+    """All grades ordered by level (grade_id, grade_name, grade_level)."""
+    return _get("grades")
+
+
+def get_dancetypes():
+    """All dance types ordered by name (dancetype_id, dancetype_name)."""
+    return _get("dancetypes")
+
+
+def get_dancetype_ids():
+    """Ids of all dance types (used to read the grade_<id> form fields)."""
+    return [dt["dancetype_id"] for dt in get_dancetypes()]
+
+
+def generation():
+    """Changes whenever the cached reference data may have changed."""
+    return _generation
+
+
+def invalidate(name=None):
+    """Drop one cached table (or all of them) so the next read reloads it."""
+    global _generation
+    with _lock:
+        _generation += 1
+        if name is None:
+            _cache.clear()
+        else:
+            _cache.pop(name, None)
+
+
+def load():
+    """(Re)load every reference table now."""
+    invalidate()
+    for name in QUERIES:
+        _get(name)
+
+
+def init_app(app):
+    """Apply REFDATA_TTL from config and warm the cache at startup."""
+    global ttl
+    ttl = app.config.get("REFDATA_TTL", ttl)
+    app.jinja_env.globals["refdata_generation"] = generation
+
+    # If the database is not reachable yet, the cache fills on first use instead
+    with app.app_context():
+        try:
+            load()
+        except MySQLdb.Error:
+            invalidate()
@@ -20,7 +20,9 @@ CREATE TABLE students (
     phone VARCHAR(20),
     date_of_birth DATE,
     enrollment_date DATE DEFAULT (CURRENT_DATE),
-    is_active BOOLEAN DEFAULT TRUE
+    is_active BOOLEAN DEFAULT TRUE,
+    -- Keyset pagination / alphabetical listing on the student list
+    KEY idx_students_name (last_name, first_name, student_id)
 );
 
 
@@ -30,7 +32,9 @@ CREATE TABLE teachers (
     last_name VARCHAR(100) NOT NULL,
     email VARCHAR(255) UNIQUE,
     phone VARCHAR(20),
-    is_active BOOLEAN DEFAULT TRUE
+    is_active BOOLEAN DEFAULT TRUE,
+    -- Keyset pagination / alphabetical listing on the teacher list
+    KEY idx_teachers_name (last_name, first_name, teacher_id)
 );
 
 
@@ -52,6 +56,8 @@ CREATE TABLE classes (
     teacher_id INT NOT NULL,
     schedule_day VARCHAR(20),
     schedule_time TIME,
+    -- Enrolment eligibility join (dance type, then grade)
+    KEY idx_classes_dance_grade (dancetype_id, grade_id),
     FOREIGN KEY (dancetype_id) REFERENCES dancetype(dancetype_id) ON DELETE RESTRICT,
     FOREIGN KEY (grade_id) REFERENCES grades(grade_id) ON DELETE SET NULL,
     FOREIGN KEY (teacher_id) REFERENCES teachers(teacher_id) ON DELETE RESTRICT
@@ -73,12 +79,66 @@ CREATE TABLE studentgrades (
     grade_id INT NOT NULL,
     dancetype_id INT NOT NULL,
     UNIQUE KEY unique_student_grade_dance (student_id, grade_id, dancetype_id),
+    -- Current grade per (student, dance type)
+    KEY idx_studentgrades_student_dance (student_id, dancetype_id, grade_id),
     FOREIGN KEY (student_id) REFERENCES students(student_id) ON DELETE CASCADE,
     FOREIGN KEY (grade_id) REFERENCES grades(grade_id) ON DELETE RESTRICT,
     FOREIGN KEY (dancetype_id) REFERENCES dancetype(dancetype_id) ON DELETE RESTRICT
 );
 
 
+-- Enrolment counters for the teacher report (maintained by the app; see counters.py).
+-- Rebuild after loading data with SQL: flask --app app rebuild-enrolment-counters
+CREATE TABLE classenrolmentcounts (
+    class_id INT PRIMARY KEY,
+    student_count INT NOT NULL DEFAULT 0,
+    FOREIGN KEY (class_id) REFERENCES classes(class_id) ON DELETE CASCADE
+);
+
+CREATE TABLE teacherstudents (
+    teacher_id INT NOT NULL,
+    student_id INT NOT NULL,
+    enrolment_count INT NOT NULL DEFAULT 0,   -- classes this student takes with this teacher
+    PRIMARY KEY (teacher_id, student_id),
+    FOREIGN KEY (teacher_id) REFERENCES teachers(teacher_id) ON DELETE CASCADE,
+    FOREIGN KEY (student_id) REFERENCES students(student_id) ON DELETE CASCADE
+);
+
+CREATE TABLE teacherstudentcounts (
+    teacher_id INT PRIMARY KEY,
+    student_count INT NOT NULL DEFAULT 0,     -- distinct students across the teacher's classes
+    FOREIGN KEY (teacher_id) REFERENCES teachers(teacher_id) ON DELETE CASCADE
+);
+
+-- Student search token index (maintained by the app; see search.py).
+-- After loading data with SQL, populate it with: flask --app app rebuild-search-index
+CREATE TABLE studentsearch (
+    token VARCHAR(100) NOT NULL,
+    student_id INT NOT NULL,
+    field TINYINT NOT NULL,          -- 1 = last name, 2 = first name, 3 = email
+    PRIMARY KEY (token, student_id, field),
+    KEY idx_studentsearch_student (student_id),
+    FOREIGN KEY (student_id) REFERENCES students(student_id) ON DELETE CASCADE
+);
+
+-- Version counter per table, bumped by every write (see versions.py).
+-- Pages derive their ETag / Last-Modified from these.
+CREATE TABLE tableversions (
+    table_name VARCHAR(64) PRIMARY KEY,
+    version BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6)
+);
+
+INSERT INTO tableversions (table_name, version) VALUES
+('dancetype', 1),
+('grades', 1),
+('students', 1),
+('studentgrades', 1),
+('studentsearch', 1),
+('teachers', 1),
+('classes', 1),
+('studentclasses', 1);
+
 
 INSERT INTO dancetype (dancetype_name) VALUES
 ('Ballet'),
@@ -130,6 +190,61 @@ INSERT INTO students (first_name, last_name, email, phone, date_of_birth, enroll
 ('Liam', 'Thompson', 'liam.thompson@email.com', '021 888 9999', '2013-10-11', '2023-05-20');
 
 
+-- Search tokens for the seed students (search.index_rows; rebuild with
+-- flask --app app rebuild-search-index after loading students with plain SQL)
+INSERT INTO studentsearch (token, student_id, field) VALUES
+('emily', 1, 2),
+('emily', 1, 3),
+('emilywilson', 1, 3),
+('wilson', 1, 1),
+('wilson', 1, 3),
+('brown', 2, 1),
+('brown', 2, 3),
+('oliver', 2, 2),
+('oliver', 2, 3),
+('oliverbrown', 2, 3),
+('sophia', 3, 2),
+('sophia', 3, 3),
+('sophiataylor', 3, 3),
+('taylor', 3, 1),
+('taylor', 3, 3),
+('anderson', 4, 1),
+('anderson', 4, 3),
+('jack', 4, 2),
+('jack', 4, 3),
+('jackanderson', 4, 3),
+('isabella', 5, 2),
+('isabella', 5, 3),
+('isabellathomas', 5, 3),
+('thomas', 5, 1),
+('thomas', 5, 3),
+('jackson', 6, 1),
+('jackson', 6, 3),
+('noah', 6, 2),
+('noah', 6, 3),
+('noahjackson', 6, 3),
+('mia', 7, 2),
+('mia', 7, 3),
+('miawhite', 7, 3),
+('white', 7, 1),
+('white', 7, 3),
+('harris', 8, 1),
+('harris', 8, 3),
+('lucas', 8, 2),
+('lucas', 8, 3),
+('lucasharris', 8, 3),
+('amelia', 9, 2),
+('amelia', 9, 3),
+('ameliamartin', 9, 3),
+('martin', 9, 1),
+('martin', 9, 3),
+('liam', 10, 2),
+('liam', 10, 3),
+('liamthompson', 10, 3),
+('thompson', 10, 1),
+('thompson', 10, 3);
+
+
 INSERT INTO classes (class_name, dancetype_id, grade_id, teacher_id, schedule_day, schedule_time) VALUES
 ('Ballet Beginners', 1, 1, 1, 'Monday', '16:00:00'),
 ('Ballet Grade 2', 1, 3, 1, 'Tuesday', '17:00:00'),
@@ -181,3 +296,38 @@ INSERT INTO studentclasses (student_id, class_id) VALUES
 (9, 1),
 (10, 2),
 (10, 5);
+
+
+-- Initialise the enrolment counters from the seed enrolments
+INSERT INTO classenrolmentcounts (class_id, student_count)
+SELECT c.class_id, COUNT(sc.student_id)
+FROM classes c
+LEFT JOIN studentclasses sc ON sc.class_id = c.class_id
+GROUP BY c.class_id;
+
+INSERT INTO teacherstudents (teacher_id, student_id, enrolment_count)
+SELECT c.teacher_id, sc.student_id, COUNT(*)
+FROM studentclasses sc
+JOIN classes c ON c.class_id = sc.class_id
+GROUP BY c.teacher_id, sc.student_id;
+
+INSERT INTO teacherstudentcounts (teacher_id, student_count)
+SELECT t.teacher_id, COUNT(ts.student_id)
+FROM teachers t
+LEFT JOIN teacherstudents ts ON ts.teacher_id = t.teacher_id
+GROUP BY t.teacher_id;
+
+
+-- Migrations (migrations/) already included in this script; see migrate.py
+CREATE TABLE schema_version (
+    version INT PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO schema_version (version, name) VALUES
+(1, 'name_indexes'),
+(2, 'student_search'),
+(3, 'enrolment_counters'),
+(4, 'table_versions'),
+(5, 'hot_path_indexes');
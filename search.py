@@ -0,0 +1,187 @@
+"""
+Student name search backed by an app-maintained token index.
+
+Each student's first name, last name and email local part are split into
+lower-case tokens and stored in `studentsearch` (PRIMARY KEY token, student_id,
+field). A search term is matched as a prefix (`token LIKE 'term%'`), which is a
+range scan on the primary key instead of the full table scan that
+`first_name LIKE '%q%'` forces. Results are ranked by where the terms matched
+(last name > first name > email) and whether they matched a whole token.
+"""
+
+import click
+
+import db
+import pagination
+import versions
+
+# Field codes stored in studentsearch.field, with their ranking weights
+FIELD_LAST_NAME = 1
+FIELD_FIRST_NAME = 2
+FIELD_EMAIL = 3
+FIELD_WEIGHTS = {FIELD_LAST_NAME: 3, FIELD_FIRST_NAME: 2, FIELD_EMAIL: 1}
+
+MAX_TOKEN_LENGTH = 100   # studentsearch.token is VARCHAR(100)
+MAX_QUERY_TERMS = 5      # extra terms only narrow results further
+
+
+def tokenize(text):
+    """
+    Split text into lower-case alphanumeric tokens.
+    "Mary-Jane O'Brien" -> ["mary", "jane", "o", "brien"]
+    """
+    tokens = []
+    current = []
+    for ch in (text or "").lower():
+        if ch.isalnum():
+            current.append(ch)
+        elif current:
+            tokens.append("".join(current))
+            current = []
+    if current:
+        tokens.append("".join(current))
+    return [t[:MAX_TOKEN_LENGTH] for t in tokens]
+
+
+def _field_tokens(value):
+    # Tokens for one indexed field, plus the joined form ("o'brien" -> "obrien")
+    tokens = tokenize(value)
+    if len(tokens) > 1:
+        tokens.append("".join(tokens)[:MAX_TOKEN_LENGTH])
+    return tokens
+
+
+def index_rows(student_id, first_name, last_name, email):
+    """Build the (token, student_id, field) rows for one student."""
+    rows = set()
+    for token in _field_tokens(last_name):
+        rows.add((token, student_id, FIELD_LAST_NAME))
+    for token in _field_tokens(first_name):
+        rows.add((token, student_id, FIELD_FIRST_NAME))
+    if email:
+        # Only the part before '@'; domains like "email.com" would match everyone
+        for token in _field_tokens(email.split("@")[0]):
+            rows.add((token, student_id, FIELD_EMAIL))
+    return sorted(rows)
+
+
+def index_student(cur, student_id, first_name, last_name, email):
+    """Replace the search tokens for one student (call after INSERT / UPDATE of students)."""
+    cur.execute("DELETE FROM studentsearch WHERE student_id = %s;", (student_id,))
+    rows = index_rows(student_id, first_name, last_name, email)
+    if rows:
+        cur.executemany("""
+            INSERT INTO studentsearch (token, student_id, field)
+            VALUES (%s, %s, %s);
+        """, rows)
+
+
+def rebuild_index(conn, batch_size=1000):
+    """
+    Rebuild the whole token index from the students table, reading students
+    in primary-key batches so memory stays bounded. Returns tokens indexed.
+    """
+    cur = conn.cursor()
+    cur.execute("DELETE FROM studentsearch;")
+
+    total = 0
+    last_id = 0
+    while True:
+        cur.execute("""
+            SELECT student_id, first_name, last_name, email
+            FROM students
+            WHERE student_id > %s
+            ORDER BY student_id
+            LIMIT %s;
+        """, (last_id, batch_size))
+        students = cur.fetchall()
+        if not students:
+            break
+
+        rows = []
+        for student_id, first_name, last_name, email in students:
+            rows.extend(index_rows(student_id, first_name, last_name, email))
+        if rows:
+            cur.executemany("""
+                INSERT INTO studentsearch (token, student_id, field)
+                VALUES (%s, %s, %s);
+            """, rows)
+        total += len(rows)
+        last_id = students[-1][0]
+
+    versions.bump(cur, "studentsearch")
+    conn.commit()
+    cur.close()
+    return total
+
+
+def _search_query(terms):
+    """
+    SQL (and parameters) returning student rows plus a `score` for students
+    matching every term as a token prefix.
+    """
+    weight_sql = "CASE ss.field " + " ".join(
+        f"WHEN {field} THEN {weight}" for field, weight in FIELD_WEIGHTS.items()) + " ELSE 0 END"
+
+    parts = []
+    params = []
+    for term in terms:
+        # Best match for this term per student: field weight, +1 for a whole-token match
+        parts.append(f"""
+            SELECT ss.student_id, MAX({weight_sql} + (ss.token = %s)) AS term_score
+            FROM studentsearch ss
+            WHERE ss.token LIKE %s
+            GROUP BY ss.student_id
+        """)
+        # Tokens are alphanumeric only, so no LIKE wildcards need escaping
+        params.extend([term, term + "%"])
+
+    query = f"""
+        SELECT * FROM (
+            SELECT
+                s.student_id,
+                s.first_name,
+                s.last_name,
+                s.email,
+                s.date_of_birth,
+                s.phone,
+                s.enrollment_date,
+                m.score
+            FROM (
+                SELECT t.student_id, CAST(SUM(t.term_score) AS SIGNED) AS score
+                FROM ({" UNION ALL ".join(parts)}) t
+                GROUP BY t.student_id
+                HAVING COUNT(*) = {len(terms)}
+            ) m
+            JOIN students s ON s.student_id = m.student_id
+        ) r
+    """
+    return query, params
+
+
+def search_page(cursor, q, after=None, before=None, page_size=50):
+    """
+    One page of students matching search text `q`, best matches first.
+    Uses keyset pagination on (score DESC, last_name, first_name, student_id).
+    """
+    terms = list(dict.fromkeys(tokenize(q)))[:MAX_QUERY_TERMS]
+    if not terms:
+        return {"rows": [], "next_cursor": None, "prev_cursor": None}
+
+    query, params = _search_query(terms)
+    return pagination.keyset_page(
+        cursor, query,
+        columns=["r.score DESC", "r.last_name", "r.first_name", "r.student_id"],
+        key_fields=["score", "last_name", "first_name", "student_id"],
+        params=params,
+        after=after, before=before, page_size=page_size)
+
+
+def init_app(app):
+    """Register the `flask rebuild-search-index` command."""
+
+    @app.cli.command("rebuild-search-index")
+    def rebuild_search_index_command():
+        """Rebuild the student search token index from the students table."""
+        total = rebuild_index(db.get_db())
+        click.echo(f"Indexed {total} search tokens.")
@@ -0,0 +1,108 @@
+"""
+Template caching: compiled templates on disk and rendered fragments in memory.
+
+Bytecode cache: compiled templates are written to a directory shared by
+every worker (TEMPLATE_BYTECODE_CACHE_DIR, default a per-user temp
+directory), so a new worker loads them instead of compiling each template
+again. Entries are keyed by the template source, so an edited template is
+simply recompiled. `flask compile-templates` fills the cache before a deploy.
+
+Fragment cache: {% cache "name", key, ... %} ... {% endcache %} renders the
+block once per distinct key and reuses the HTML afterwards. Use it only for
+markup that depends on nothing but the keys given (and the app's script
+root, which is added automatically), e.g. the nav and footer in base.html
+or the grade dropdowns built from reference data. Fragments are not cached
+while templates auto-reload (debug mode), so template edits show up at once.
+"""
+
+import threading
+
+import click
+from flask import has_request_context, request
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+
+# Most fragments kept; the oldest are dropped first (set from app config by init_app)
+max_entries = 512
+
+# False turns {% cache %} into a plain block (set from app config by init_app)
+enabled = True
+
+_lock = threading.Lock()
+_fragments = {}   # key -> rendered Markup
+
+_stats = {"hits": 0, "misses": 0}
+
+
+class FragmentCacheExtension(Extension):
+    """The {% cache key, ... %} ... {% endcache %} tag."""
+
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        keys = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            keys.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        # The template name keeps equal keys in different templates apart
+        keys.insert(0, nodes.Const(parser.name))
+        return nodes.CallBlock(self.call_method("_render", [nodes.List(keys)]), [], [], body).set_lineno(lineno)
+
+    def _render(self, keys, caller):
+        if not enabled or self.environment.auto_reload:
+            return caller()
+
+        key = (request.script_root if has_request_context() else "", *keys)
+        html = _fragments.get(key)
+        if html is not None:
+            _stats["hits"] += 1
+            return html
+
+        html = caller()
+        with _lock:
+            _stats["misses"] += 1
+            if len(_fragments) >= max_entries and key not in _fragments:
+                # Dicts keep insertion order, so the first key is the oldest
+                del _fragments[next(iter(_fragments))]
+            _fragments[key] = html
+        return html
+
+
+def invalidate():
+    """Drop every cached fragment."""
+    with _lock:
+        _fragments.clear()
+
+
+def stats():
+    # Fragment hit / miss counts and current size
+    with _lock:
+        return dict(_stats, entries=len(_fragments), enabled=enabled)
+
+
+def compile_templates(app):
+    """Load every template once so its bytecode is in the cache. Returns the number loaded."""
+    names = app.jinja_env.list_templates(filter_func=lambda name: name.endswith(".html"))
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
+
+def init_app(app):
+    """Install the bytecode cache and {% cache %} tag; register `flask compile-templates`."""
+    global enabled, max_entries
+    enabled = app.config["TEMPLATE_FRAGMENT_CACHE"]
+    max_entries = app.config["TEMPLATE_FRAGMENT_MAX_ENTRIES"]
+
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    if app.config["TEMPLATE_BYTECODE_CACHE"]:
+        # Jinja picks a private per-user temp directory when none is given
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config["TEMPLATE_BYTECODE_CACHE_DIR"])
+
+    @app.cli.command("compile-templates")
+    def compile_templates_command():
+        """Compile every template into the bytecode cache."""
+        if app.jinja_env.bytecode_cache is None:
+            raise click.ClickException("TEMPLATE_BYTECODE_CACHE is off.")
+        click.echo(f"Compiled {compile_templates(app)} template(s).")
@@ -0,0 +1,271 @@
+"""
+Student form validation shared by the Add / Edit pages and the CSV import.
+
+The rules are declared once (STUDENT_FIELDS) and compiled into a
+FormValidator that is reused for every form. validate() checks one form;
+validate_many() checks an iterable of rows (e.g. a CSV reader) and reuses
+the date window for the whole batch. Errors are returned per field.
+"""
+
+from datetime import date, datetime
+
+
+# ==============================
+# Date helpers
+# ==============================
+
+_window = None   # (today, min_dob, max_dob), recomputed when the day changes
+
+
+def _years_before(today, years):
+    # Same day `years` earlier (28th for 29 February in a non-leap year)
+    try:
+        return date(today.year - years, today.month, today.day)
+    except ValueError:
+        return date(today.year - years, today.month, 28)
+
+
+def date_window():
+    """(today, min_dob, max_dob): students are 1 to 20 years old. Cached per day."""
+    global _window
+    today = date.today()
+    if _window is None or _window[0] != today:
+        _window = (today, _years_before(today, 20), _years_before(today, 1))
+    return _window
+
+
+def get_dob_limits():
+    """
+    DOB limits for HTML date picker.
+    - min: today - 20 years
+    - max: today - 1 year  (student must be at least 1 year old)
+    Returns (dob_min, dob_max) as ISO strings.
+    """
+    _today, min_dob, max_dob = date_window()
+    return min_dob.isoformat(), max_dob.isoformat()
+
+
+def parse_iso_date(value):
+    """YYYY-MM-DD (the HTML date picker format) to a date, or None if invalid."""
+    # Fast path for the zero-padded form the date picker sends
+    if len(value) == 10 and value[4] == "-" and value[7] == "-":
+        year, month, day = value[:4], value[5:7], value[8:]
+        if year.isdigit() and month.isdigit() and day.isdigit():
+            try:
+                return date(int(year), int(month), int(day))
+            except ValueError:
+                return None
+    # Anything else strptime accepts (e.g. 2012-3-5 typed into a CSV)
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+# ==============================
+# Rules
+# ==============================
+# A rule is called with (value, label, window) and returns an error message or None.
+
+class Length:
+    """Minimum / maximum number of characters."""
+
+    def __init__(self, minimum, maximum):
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def __call__(self, value, label, window):
+        if len(value) < self.minimum:
+            return f"{label} must be at least {self.minimum} characters."
+        if len(value) > self.maximum:
+            return f"{label} must be {self.maximum} characters or fewer."
+        return None
+
+
+class NameChars:
+    """Letters plus space, hyphen and apostrophe; no digits."""
+
+    _extra = str.maketrans("", "", " -'")
+
+    def __call__(self, value, label, window):
+        letters = value.translate(self._extra)
+        if not letters or letters.isalpha():
+            return None
+        if any(ch.isdigit() for ch in letters):
+            return f"{label} cannot contain numbers."
+        return f"{label} can only contain letters, spaces, hyphens, or apostrophes."
+
+
+class EmailFormat:
+    """One '@', something before it and a dotted domain after it."""
+
+    def __call__(self, value, label, window):
+        if value.count("@") != 1:
+            return "Email must contain one '@'."
+        local, domain = value.split("@")
+        if not local:
+            return "Email is missing the part before '@'."
+        if not domain:
+            return "Email is missing the domain after '@'."
+        if domain.startswith(".") or domain.endswith("."):
+            return "Email domain cannot start or end with a dot '.'."
+        if "." not in domain:
+            return "Email domain must contain a dot (e.g., example.com)."
+        return None
+
+
+class MinDigits:
+    """At least `count` digits anywhere in the value."""
+
+    def __init__(self, count):
+        self.count = count
+
+    _ascii_digits = str.maketrans("", "", "0123456789")
+
+    def __call__(self, value, label, window):
+        if value.isascii():
+            digits = len(value) - len(value.translate(self._ascii_digits))
+        else:
+            digits = sum(ch.isdigit() for ch in value)
+        if digits < self.count:
+            return f"{label} must contain at least {self.count} digits."
+        return None
+
+
+class DobWindow:
+    """Date of birth 1 to 20 years ago."""
+
+    def __call__(self, value, label, window):
+        _today, min_dob, max_dob = window
+        if value > max_dob:
+            return "Student must be at least 1 year old."
+        if value < min_dob:
+            return "Date of birth must be within the last 20 years."
+        return None
+
+
+class NotFuture:
+    def __call__(self, value, label, window):
+        if value > window[0]:
+            return f"{label} cannot be in the future."
+        return None
+
+
+# ==============================
+# Fields and the compiled validator
+# ==============================
+
+class Field:
+    """
+    One form field.
+    - required: blank is an error ("<label> is required.")
+    - blank: clean value when blank (a callable gets the date window)
+    - parse: (raw -> value or None, message when None), e.g. dates
+    - rules: checked in order; the first failing one is the field's error
+    - keep_invalid: keep the value in the clean data when a rule fails
+    """
+
+    def __init__(self, name, label, rules=(), required=False, blank=None, parse=None, keep_invalid=True):
+        self.name = name
+        self.label = label
+        self.rules = tuple(rules)
+        self.required = required
+        self.blank = blank
+        self.parse = parse
+        self.keep_invalid = keep_invalid
+
+
+class FormValidator:
+    """Validates forms against a fixed tuple of Fields, compiled once into a flat plan."""
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        # Per field: (name, label, rules, required message, blank, blank is callable,
+        #             parse function, parse message, keep_invalid)
+        self._plan = tuple(
+            (f.name, f.label, f.rules, f"{f.label} is required." if f.required else None,
+             f.blank, callable(f.blank), f.parse[0] if f.parse else None, f.parse[1] if f.parse else None,
+             f.keep_invalid)
+            for f in self.fields
+        )
+
+    def validate(self, form, window=None):
+        """Returns (clean_data, {field name: [messages]}) for one form (any mapping)."""
+        window = window or date_window()
+        get = form.get
+        clean = {}
+        errors = {}
+
+        for name, label, rules, required, blank, blank_fn, parse, parse_message, keep in self._plan:
+            raw = get(name)
+            raw = raw.strip() if raw else ""
+
+            if not raw:
+                if required:
+                    errors[name] = [required]
+                clean[name] = blank(window) if blank_fn else blank
+                continue
+
+            value = raw
+            if parse is not None:
+                value = parse(raw)
+                if value is None:
+                    errors[name] = [parse_message]
+                    clean[name] = None
+                    continue
+
+            for rule in rules:
+                message = rule(value, label, window)
+                if message:
+                    errors[name] = [message]
+                    if not keep:
+                        value = None
+                    break
+            # Parsed dates go back to ISO strings, as stored / redisplayed in the form
+            clean[name] = value.isoformat() if parse is not None and value is not None else value
+
+        return clean, errors
+
+    def validate_many(self, rows):
+        """Yield (row, clean_data, errors by field) for each row, using one date window for the batch."""
+        window = date_window()
+        validate = self.validate
+        for row in rows:
+            clean, errors = validate(row, window)
+            yield row, clean, errors
+
+
+def flat_errors(errors):
+    """Messages from an errors-by-field dict, in field order."""
+    return [message for messages in errors.values() for message in messages]
+
+
+_DATE = parse_iso_date
+
+# Rules :
+# - first_name / last_name: required; min length 2; letters only (spaces, hyphen, apostrophe allowed); max length 50
+# - email: optional; basic format check (no regex)
+# - phone: must contain at least 6 digits if provided
+# - date_of_birth: REQUIRED; must be valid date; sensible range (today-20 years to today-1 year)
+# - enrollment_date: defaults to today; if provided, cannot be future
+STUDENT_FIELDS = (
+    Field("first_name", "First name", required=True, blank="", rules=(Length(2, 50), NameChars())),
+    Field("last_name", "Last name", required=True, blank="", rules=(Length(2, 50), NameChars())),
+    Field("email", "Email", rules=(EmailFormat(),)),
+    Field("phone", "Phone", rules=(MinDigits(6),)),
+    Field("date_of_birth", "Date of birth", required=True,
+          parse=(_DATE, "Please select a valid date of birth."), rules=(DobWindow(),)),
+    Field("enrollment_date", "Enrollment date", blank=lambda window: window[0].isoformat(),
+          parse=(_DATE, "Please select a valid enrollment date."), rules=(NotFuture(),), keep_invalid=False),
+)
+
+STUDENT_FORM = FormValidator(STUDENT_FIELDS)
+
+
+def validate_student_form(form):
+    """
+    Validation shared by Add + Edit.
+    Returns (clean_data, errors) with errors as a flat list of messages.
+    """
+    clean, errors = STUDENT_FORM.validate(form)
+    return clean, flat_errors(errors)
@@ -0,0 +1,163 @@
+"""
+Per-table version counters for conditional GET (ETag / Last-Modified).
+
+Every write path bumps the versions of the tables it changes, in the same
+transaction as the write (bump() runs as the transaction's last statement).
+List and report pages declare the tables they read (@conditional(...));
+when the browser's If-None-Match (or If-Modified-Since) still matches those
+versions the page answers 304 Not Modified after one primary-key read,
+without running its queries.
+
+Data changed with plain SQL is not seen until the tables are bumped:
+flask --app app bump-table-versions [TABLE ...]
+"""
+
+import functools
+import hashlib
+import os
+
+import click
+from flask import Response, current_app, g, has_app_context, request, session
+
+import db
+
+# Tables the app tracks (one row each in tableversions)
+TABLES = (
+    "dancetype",
+    "grades",
+    "students",
+    "studentgrades",
+    "studentsearch",
+    "teachers",
+    "classes",
+    "studentclasses",
+)
+
+# Changes when the templates change, so a deploy doesn't leave browsers on stale HTML
+_template_token = ""
+
+
+def _upsert(cur, tables):
+    cur.executemany("""
+        INSERT INTO tableversions (table_name, version)
+        VALUES (%s, 1)
+        ON DUPLICATE KEY UPDATE version = version + 1, updated_at = CURRENT_TIMESTAMP(6);
+    """, [(t,) for t in sorted(set(tables))])
+
+
+def bump(cur, *tables):
+    """
+    Increment the versions of `tables` (one multi-row upsert).
+
+    Each table's tableversions row is locked until commit, so inside
+    db.transaction() the upsert is deferred to just before the commit:
+    writers of the same table queue only for that moment, not for the whole
+    transaction (e.g. a CSV import batch). Outside a transaction, or outside
+    the app (scripts and benchmarks), it runs now.
+    """
+    if not has_app_context():
+        _upsert(cur, tables)
+        return
+    g.pop("table_versions", None)
+    if not db.defer_until_commit("table_versions", _upsert, tables):
+        _upsert(cur, tables)
+
+
+def current(tables):
+    """
+    {table: (version, updated_at)} for `tables` (missing tables are left out).
+    Read once per request; bump() drops the request's copy.
+    """
+    known = g.setdefault("table_versions", {})
+    missing = [t for t in tables if t not in known]
+    if missing:
+        cur = db.get_cursor()
+        placeholders = ", ".join(["%s"] * len(missing))
+        cur.execute(f"""
+            SELECT table_name, version, updated_at
+            FROM tableversions
+            WHERE table_name IN ({placeholders});
+        """, missing)
+        found = {r["table_name"]: (r["version"], r["updated_at"]) for r in cur.fetchall()}
+        for t in missing:
+            known[t] = found.get(t)
+    return {t: known[t] for t in tables if known[t] is not None}
+
+
+def _validators(tables):
+    # (etag, last_modified) for the current request over `tables`
+    versions = current(tables)
+    state = ";".join(f"{t}={versions.get(t, (0, None))[0]}" for t in tables)
+    digest = hashlib.sha1(f"{_template_token}|{request.full_path}|{state}".encode()).hexdigest()
+    stamps = [updated_at for _version, updated_at in versions.values() if updated_at is not None]
+    return digest[:32], (max(stamps).replace(microsecond=0) if stamps else None)
+
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    # If-Modified-Since only counts when the browser sent no ETag
+    return bool(last_modified and request.if_modified_since
+                and last_modified <= request.if_modified_since.replace(tzinfo=None))
+
+
+def conditional(*tables):
+    """
+    Decorator for GET pages built only from `tables`: adds ETag / Last-Modified
+    and answers 304 when the browser's copy is still current.
+    """
+    tables = tuple(sorted(tables))
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            # Pending flash messages belong to this render only, so never serve or
+            # label it as the cached page
+            if (not current_app.config["CONDITIONAL_GET"] or request.method != "GET"
+                    or session.get("_flashes")):
+                return view(*args, **kwargs)
+
+            etag, last_modified = _validators(tables)
+            if _not_modified(etag, last_modified):
+                response = Response(status=304)
+            else:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            # Let browsers keep the page but always revalidate it
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
+
+
+def _hash_templates(template_folder):
+    digest = hashlib.sha1()
+    for root, dirs, files in os.walk(template_folder):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            digest.update(os.path.relpath(path, template_folder).encode())
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def init_app(app):
+    """Fingerprint the templates and register `flask bump-table-versions`."""
+    global _template_token
+    _template_token = _hash_templates(os.path.join(app.root_path, app.template_folder))
+
+    @app.cli.command("bump-table-versions")
+    @click.argument("tables", nargs=-1, type=click.Choice(TABLES))
+    def bump_table_versions_command(tables):
+        """Invalidate cached pages after editing TABLES (default: all) with SQL."""
+        with db.transaction():
+            cur = db.get_cursor()
+            bump(cur, *(tables or TABLES))
+            cur.close()
+        click.echo(f"Bumped {', '.join(tables or TABLES)}.")